@@ -74,6 +74,10 @@ class Analysis:
     week_of_latest_extract: str = field(
         validator=date_string, default=dates.WEEK_OF_LATEST_EXTRACT
     )
+    # run every action after the cohort extractions as a single action
+    single_action: bool = field(converter=bool, default=False)
+    # draw the figures as PNGs with matplotlib, or as SVGs
+    figure_format: str = field(validator=validators.in_(["png", "svg"]), default="png")
 
     # request data filled in later
     created_by: str | None = None
@@ -0,0 +1,130 @@
+import argparse
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from analysis.cohorts import read_schema
+
+
+DATE = r"20\d\d-(?:0[1-9]|1[012])-(?:0[1-9]|[12][0-9]|3[01])"
+MONTHLY_PATTERN = re.compile(rf"input_(?P<date>{DATE})\.feather")
+WEEKLY_PATTERN = re.compile(rf"input_weekly_(?P<date>{DATE})\.feather")
+
+# The directory that cohort-joiner writes the joined cohort files to
+JOINED_DIR = "joined"
+
+
+@dataclass(frozen=True)
+class CohortFile:
+    """A cohort file, as extracted by cohort-extractor or joined by cohort-joiner."""
+
+    path: Path
+    date: str
+    weekly: bool
+    joined: bool
+    size: int
+    columns: tuple
+
+
+def match_cohort_file(path):
+    """
+    Matches the name of a cohort file.
+
+    Args:
+        path (Path): The path to the file.
+
+    Returns:
+        tuple: The date of the cohort file, and whether it is weekly, or None if the
+               file isn't a cohort file.
+    """
+    for pattern, weekly in [(MONTHLY_PATTERN, False), (WEEKLY_PATTERN, True)]:
+        match = pattern.fullmatch(path.name)
+        if match:
+            return match.group("date"), weekly
+    return None
+
+
+def discover(directory):
+    """
+    Discovers the cohort files in a directory and its joined subdirectory.
+
+    Other files, such as plots, and other subdirectories are not scanned. A directory
+    named "joined" is itself treated as a directory of joined cohort files.
+
+    Args:
+        directory (Path): The directory to discover cohort files in.
+
+    Returns:
+        list: A CohortFile for each cohort file, ordered by date, with monthly before
+              weekly files, and raw before joined files, for each date.
+    """
+    directory = Path(directory)
+    directories = [directory]
+    if (directory / JOINED_DIR).is_dir():
+        directories.append(directory / JOINED_DIR)
+
+    catalog = []
+    for d in directories:
+        for path in d.iterdir():
+            matched = match_cohort_file(path)
+            if matched is None or not path.is_file():
+                continue
+            date, weekly = matched
+            catalog.append(
+                CohortFile(
+                    path=path,
+                    date=date,
+                    weekly=weekly,
+                    joined=d.name == JOINED_DIR,
+                    size=path.stat().st_size,
+                    columns=tuple(read_schema(path).names),
+                )
+            )
+    return sorted(catalog, key=lambda f: (f.date, f.weekly, f.joined))
+
+
+def select(catalog, weekly=False, joined=None):
+    """
+    Selects cohort files from a catalog, with at most one file for each date.
+
+    Args:
+        catalog (list): The catalog, from `discover`.
+        weekly (bool, optional): Whether to select weekly, rather than monthly, files.
+                                 Defaults to False.
+        joined (bool, optional): Whether to select joined, or raw, files. Defaults to
+                                 None, which selects the joined file for each date if
+                                 there is one, and otherwise the raw file.
+
+    Returns:
+        list: The selected CohortFiles, ordered by date.
+    """
+    selected = {}
+    for cohort_file in catalog:
+        if cohort_file.weekly != weekly:
+            continue
+        if joined is not None and cohort_file.joined != joined:
+            continue
+        # raw files are ordered before joined files, so joined files replace them
+        selected[cohort_file.date] = cohort_file
+    return list(selected.values())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="List the cohort files in a directory")
+    parser.add_argument("directory", type=Path, help="directory to list")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    for cohort_file in discover(args.directory):
+        kind = "weekly" if cohort_file.weekly else "monthly"
+        joined = "joined" if cohort_file.joined else "raw"
+        print(
+            f"{cohort_file.date}  {kind:<7}  {joined:<6}  {cohort_file.size:>12}  "
+            f"{cohort_file.path}  {','.join(cohort_file.columns)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,493 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from analysis.dtypes import CATEGORICAL_COLUMNS, compact_dtypes
+from pyarrow import feather, fs
+
+
+# The column that cohort files and lookups are joined on
+KEY = "patient_id"
+
+# The lookup that `init_worker` reads once in each worker process
+_worker_lookup = None
+
+
+def read_schema(path):
+    """Reads the schema of a cohort file, without reading any of its columns."""
+    with pa.memory_map(str(path)) as source:
+        return pa.ipc.open_file(source).schema
+
+
+def encode_strings(table, columns):
+    """
+    Dictionary-encodes the string columns of an Arrow table.
+
+    The encoded columns are converted to categoricals rather than to Python strings.
+
+    Args:
+        table (pa.Table): The Arrow table.
+        columns (list): The names of the columns to encode, if they are strings.
+
+    Returns:
+        tuple: The Arrow table and the names of the columns that were encoded.
+    """
+    encoded = []
+    for i, field in enumerate(table.schema):
+        if field.name in columns and pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, table[i].dictionary_encode())
+            encoded.append(field.name)
+    return table, encoded
+
+
+class Lookup:
+    """
+    A lookup of patients' values, such as the ethnicity cohort file, indexed by
+    patient_id.
+
+    The index is the sorted patient_ids, and the row of each one, so that each batch
+    of a cohort file is joined with a binary search, rather than by hashing the
+    patient_ids of the whole lookup again.
+    """
+
+    def __init__(self, table, path=None):
+        # A column of one chunk is much quicker to take rows from
+        self.table = table.combine_chunks()
+        self.path = path
+        keys = self.table[KEY].to_numpy()
+        if (keys[1:] >= keys[:-1]).all():
+            # cohort files are usually sorted by patient_id already
+            self.rows = np.arange(len(keys))
+        else:
+            # A stable sort, so that the first row of a patient is found first
+            self.rows = np.argsort(keys, kind="stable")
+        self.keys = keys[self.rows]
+
+    @property
+    def column_names(self):
+        return self.table.column_names
+
+    @property
+    def nbytes(self):
+        """The memory that the lookup and its index are held in."""
+        return self.table.nbytes + self.keys.nbytes + self.rows.nbytes
+
+    def take(self, keys):
+        """
+        Finds the row of the lookup for each patient_id.
+
+        Args:
+            keys (pa.ChunkedArray): The patient_ids.
+
+        Returns:
+            pa.Array: The row of each patient_id, or null if it isn't in the lookup.
+        """
+        keys = keys.to_numpy()
+        if not len(self.keys):
+            return pa.nulls(len(keys), pa.int64())
+        positions = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        return pa.array(self.rows[positions], mask=self.keys[positions] != keys)
+
+
+def read_lookup(path, columns=None):
+    """
+    Reads a lookup of patients' values, such as the ethnicity cohort file.
+
+    Args:
+        path (Path): The path to the lookup (Feather, or Arrow IPC), with a
+            patient_id column.
+        columns (list, optional): The names of the columns to look up. Columns that
+            aren't in the lookup are ignored. Defaults to every column.
+
+    Returns:
+        Lookup: The key and the columns to look up, indexed by the key.
+    """
+    if columns is not None:
+        names = read_schema(path).names
+        columns = [KEY, *(c for c in columns if c in names and c != KEY)]
+    return Lookup(feather.read_table(str(path), columns=columns), path)
+
+
+def init_worker(lookup_path=None, columns=None):
+    """
+    Reads a lookup once in a worker process, for `call_with_worker_lookup`.
+
+    The lookup is read by each worker, rather than pickled for each cohort file that
+    the worker is sent.
+    """
+    global _worker_lookup
+    if lookup_path is not None:
+        _worker_lookup = read_lookup(lookup_path, columns)
+
+
+def worker_initargs(lookup=None):
+    """The arguments to `init_worker` that read a lookup again."""
+    if lookup is None:
+        return ()
+    return lookup.path, lookup.column_names
+
+
+def call_with_worker_lookup(function, *args, **kwargs):
+    """Calls a function with the lookup that `init_worker` read in this process."""
+    return function(*args, lookup=_worker_lookup, **kwargs)
+
+
+def worker_budget(memory_budget, workers=1, lookup=None):
+    """
+    Shares a memory budget between worker processes.
+
+    Each worker holds a copy of the lookup, as does this process, so the memory that
+    they are held in isn't available for reading cohort files.
+
+    Args:
+        memory_budget (int, optional): The memory, in bytes.
+        workers (int): The number of worker processes. Defaults to 1, which reads the
+            cohort files in this process.
+        lookup (Lookup, optional): The lookup. Defaults to None.
+
+    Returns:
+        int: The memory, in bytes, that each worker can read cohort files in, or None
+            if there is no budget.
+    """
+    if memory_budget is None:
+        return None
+    copies = workers + 1 if workers > 1 else 1
+    if lookup is not None:
+        memory_budget -= copies * lookup.nbytes
+    return max(memory_budget // workers, 1)
+
+
+def lookup_columns(lookup, names):
+    """The columns of a lookup that are joined to a cohort file with these columns."""
+    if lookup is None:
+        return []
+    return [name for name in lookup.column_names if name != KEY and name not in names]
+
+
+def join_lookup(table, lookup, columns):
+    """
+    Joins columns of a lookup to an Arrow table, as a left join on patient_id.
+
+    Patients that aren't in the lookup have missing values. If a patient is in the
+    lookup more than once, then their first row is used.
+
+    Args:
+        table (pa.Table): The scanned columns, with the key.
+        lookup (Lookup): The lookup, from `read_lookup`.
+        columns (list): The names of the columns to join.
+
+    Returns:
+        pa.Table: The table, with the joined columns.
+    """
+    if not columns:
+        return table
+    rows = lookup.take(table[KEY])
+    for column in columns:
+        table = table.append_column(column, lookup.table[column].take(rows))
+    return table
+
+
+def plan_scan(names, columns=None, filters=None, lookup=None):
+    """
+    Plans which columns of a cohort file to scan, ignoring those that aren't in it.
+
+    Columns that aren't in the cohort file, but are in the lookup, are joined from the
+    lookup, so the key is scanned for them.
+
+    Args:
+        names (list): The names of the columns in the cohort file.
+        columns (list, optional): See `read_cohort`.
+        filters (dict, optional): See `read_cohort`.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Returns:
+        tuple: The columns to return, the filters to apply, the columns to scan, and
+            the columns to join from the lookup.
+    """
+    joinable = lookup_columns(lookup, names)
+    available = [*names, *joinable]
+    filters = {
+        column: values
+        for column, values in (filters or {}).items()
+        if column in available
+    }
+    if columns is None:
+        columns = available
+    columns = [column for column in columns if column in available]
+    needed = columns + [column for column in filters if column not in columns]
+    joined = [column for column in needed if column in joinable]
+    scanned = [column for column in needed if column not in joined]
+    if joined and KEY not in scanned:
+        scanned.append(KEY)
+    return columns, filters, scanned, joined
+
+
+def to_frame(table, columns, filters, compact=True, lookup=None, joined=()):
+    """
+    Filters an Arrow table of scanned columns, and converts it to a DataFrame.
+
+    Args:
+        table (pa.Table): The scanned columns.
+        columns (list): The names of the columns to return.
+        filters (dict): The filters to apply.
+        compact (bool, optional): See `read_cohort`.
+        lookup (Lookup, optional): See `read_cohort`.
+        joined (list, optional): The names of the columns to join from the lookup.
+
+    Returns:
+        pd.DataFrame: The requested columns of the rows that pass the filters.
+    """
+    table = join_lookup(table, lookup, joined)
+    for column, values in filters.items():
+        table = table.filter(pc.is_in(table[column], value_set=pa.array(values)))
+    table = table.select(columns)
+    if not compact:
+        return table.to_pandas()
+
+    table, encoded = encode_strings(table, CATEGORICAL_COLUMNS)
+    df = table.to_pandas()
+    for column in encoded:
+        # Arrow orders the categories by appearance, but the groups of a column of
+        # strings are sorted
+        categories = sorted(df[column].cat.categories)
+        df[column] = df[column].cat.reorder_categories(categories)
+    return compact_dtypes(df)
+
+
+def read_cohort(path, columns=None, filters=None, compact=True, lookup=None):
+    """
+    Reads a cohort file, scanning only the columns and rows that are needed.
+
+    The file is memory-mapped, so only the requested columns are read from disk.
+    Filters are applied to the Arrow table, before it is converted to a DataFrame with
+    compact dtypes.
+
+    Columns that aren't in the file can be joined from a lookup, as cohort-joiner
+    would join them, so that a joined copy of the file isn't needed.
+
+    Args:
+        path (Path): The path to the cohort file (Feather, or Arrow IPC).
+        columns (list, optional): The names of the columns to return. Columns that
+            aren't in the file are ignored. Defaults to all columns.
+        filters (dict, optional): A dictionary where keys are column names and values
+            are lists of the desired values for that column, as for
+            `measures.filter_data`. Columns that aren't in the file are ignored.
+        compact (bool, optional): Whether to convert the columns to compact dtypes, with
+            `dtypes.compact_dtypes`. Defaults to True.
+        lookup (Lookup, optional): A lookup, from `read_lookup`, to join the columns
+            that aren't in the file from. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The requested columns of the rows that pass the filters.
+    """
+    columns, filters, scanned, joined = plan_scan(
+        read_schema(path).names, columns, filters, lookup
+    )
+    table = feather.read_table(str(path), columns=scanned, memory_map=True)
+    return to_frame(table, columns, filters, compact, lookup, joined)
+
+
+def count_rows(path):
+    """
+    Counts the rows of a cohort file.
+
+    The file is memory-mapped, and the row count of each record batch is read from its
+    metadata, so no column is decompressed.
+    """
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(str(path), format="ipc", filesystem=filesystem).count_rows()
+
+
+def estimate_size(path, columns=None):
+    """
+    Estimates the memory needed to read columns of a cohort file into a DataFrame.
+
+    Only the file's metadata is read. Fixed-width columns need their width, and other
+    columns (strings, which are read as categoricals) are assumed to need 8 bytes.
+    Each row is counted twice, as it is held by both the Arrow table and the
+    DataFrame while the file is converted.
+
+    Args:
+        path (Path): The path to the cohort file.
+        columns (list, optional): The names of the columns to read. Defaults to all
+            columns.
+
+    Returns:
+        tuple: The number of rows in the file, and the estimated bytes per row.
+    """
+    row_bytes = 0
+    for field in read_schema(path):
+        if columns is not None and field.name not in columns:
+            continue
+        try:
+            row_bytes += max(field.type.bit_width // 8, 1)
+        except ValueError:
+            row_bytes += 8
+    return count_rows(path), 2 * row_bytes
+
+
+def iter_cohort_batches(
+    path, columns=None, filters=None, batch_size=65_536, lookup=None
+):
+    """
+    Reads a cohort file in batches of at most `batch_size` rows.
+
+    Only one batch is held in memory at a time, so a file can be processed in bounded
+    memory. Only the scanned columns of each record batch are read. Each batch is
+    filtered and converted as by `read_cohort`, but the categories of a column of
+    strings are the values in the batch, rather than in the file.
+
+    Args:
+        path (Path): The path to the cohort file.
+        columns (list, optional): See `read_cohort`.
+        filters (dict, optional): See `read_cohort`.
+        batch_size (int, optional): The maximum number of rows in each batch.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Yields:
+        pd.DataFrame: The requested columns of the rows in each batch that pass the
+            filters. At least one DataFrame is yielded, even if the file is empty.
+    """
+    views = [(columns, filters)]
+    for (df,) in iter_cohort_view_batches(path, views, batch_size, lookup):
+        yield df
+
+
+def iter_cohort_view_batches(path, views, batch_size=65_536, lookup=None):
+    """
+    Reads a cohort file once, in batches, and yields a DataFrame for each view of
+    each batch.
+
+    The columns that any of the views need are scanned once, as by
+    `read_cohort_views`, and each batch is read as by `iter_cohort_batches`.
+
+    Args:
+        path (Path): The path to the cohort file.
+        views (list): See `read_cohort_views`.
+        batch_size (int, optional): The maximum number of rows in each batch.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Yields:
+        list: A DataFrame for each view of each batch. At least one list is yielded,
+            even if the file is empty.
+    """
+    schema = read_schema(path)
+    plans = [
+        plan_scan(schema.names, columns, filters, lookup) for columns, filters in views
+    ]
+    scanned = list(
+        dict.fromkeys(c for _, _, plan_scanned, _ in plans for c in plan_scanned)
+    )
+
+    def convert(table):
+        return [
+            to_frame(table, columns, filters, lookup=lookup, joined=joined)
+            for columns, filters, _, joined in plans
+        ]
+
+    options = pa.ipc.IpcReadOptions(
+        included_fields=[schema.get_field_index(column) for column in scanned]
+    )
+    with pa.memory_map(str(path)) as source:
+        reader = pa.ipc.open_file(source, options=options)
+        empty = True
+        for i in range(reader.num_record_batches):
+            table = pa.Table.from_batches([reader.get_batch(i)]).select(scanned)
+            for offset in range(0, table.num_rows, batch_size):
+                empty = False
+                yield convert(table.slice(offset, batch_size))
+        if empty:
+            yield convert(schema.empty_table().select(scanned))
+
+
+def read_cohort_views(path, views, lookup=None):
+    """
+    Reads a cohort file once, and returns a DataFrame for each view of it.
+
+    The columns that any of the views need are scanned once, and each view is then
+    filtered and converted from the same Arrow table.
+
+    Args:
+        path (Path): The path to the cohort file.
+        views (list): A list of (columns, filters) tuples, as for `read_cohort`.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Returns:
+        list: A DataFrame for each view, as `read_cohort` would return.
+    """
+    names = read_schema(path).names
+    plans = [plan_scan(names, columns, filters, lookup) for columns, filters in views]
+    scanned = list(
+        dict.fromkeys(c for _, _, plan_scanned, _ in plans for c in plan_scanned)
+    )
+    table = feather.read_table(str(path), columns=scanned, memory_map=True)
+    return [
+        to_frame(table, columns, filters, lookup=lookup, joined=joined)
+        for columns, filters, _, joined in plans
+    ]
+
+
+def prefetch(read, paths):
+    """
+    Reads files in turn, reading the next file in the background.
+
+    While the caller processes one file, the next is read on a background thread, so
+    reading overlaps with processing.
+
+    Args:
+        read (callable): The function to read a file with, given its path.
+        paths (list): The paths to the files.
+
+    Yields:
+        tuple: The path to each file and what `read` returned, in the order of paths.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(read, paths[0])
+        for i, path in enumerate(paths):
+            data = future.result()
+            if i + 1 < len(paths):
+                future = executor.submit(read, paths[i + 1])
+            yield path, data
+
+
+def iter_cohorts(paths, columns=None, filters=None, lookup=None):
+    """
+    Reads cohort files in turn, reading the next file in the background.
+
+    Args:
+        paths (list): The paths to the cohort files.
+        columns (list, optional): See `read_cohort`.
+        filters (dict, optional): See `read_cohort`.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Yields:
+        tuple: The path to each cohort file and its DataFrame, in the order of paths.
+    """
+    read = functools.partial(
+        read_cohort, columns=columns, filters=filters, lookup=lookup
+    )
+    yield from prefetch(read, paths)
+
+
+def iter_cohort_views(paths, views, lookup=None):
+    """
+    Reads cohort files in turn, reading the next file in the background.
+
+    Args:
+        paths (list): The paths to the cohort files.
+        views (list): See `read_cohort_views`.
+        lookup (Lookup, optional): See `read_cohort`.
+
+    Yields:
+        tuple: The path to each cohort file and a list of a DataFrame for each view,
+            in the order of paths.
+    """
+    read = functools.partial(read_cohort_views, views=views, lookup=lookup)
+    yield from prefetch(read, paths)
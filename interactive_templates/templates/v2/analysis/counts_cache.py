@@ -0,0 +1,158 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+
+# Change this when the format of the cached counts, or of their keys, changes, so
+# that existing entries are no longer used
+CACHE_VERSION = 2
+
+
+def file_signature(path):
+    """
+    Gets the size and modification time of a file, which change when it is rewritten.
+
+    Only the file's metadata is read, so checking the cache doesn't read the file.
+    """
+    stat = Path(path).stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def source_digest(*objects):
+    """
+    Calculates the SHA-256 digest of the source code of functions or modules.
+
+    A digest of the code that calculates the counts is passed to `cache_key`, so that
+    counts cached by a different version of it are not used.
+    """
+    digest = hashlib.sha256()
+    for obj in objects:
+        digest.update(inspect.getsource(obj).encode())
+    return digest.hexdigest()
+
+
+def cache_key(path, *params):
+    """
+    Creates the key for the cached counts of an input file.
+
+    The key depends on the name, size and modification time of the input file, and on
+    the parameters that the counts were calculated with. The name is part of the key,
+    as the date of the counts is taken from it.
+
+    Args:
+        path (Path): The path to the input file.
+        *params: The parameters that the counts were calculated with. They must be
+            serialisable as JSON.
+
+    Returns:
+        str: The key.
+    """
+    path = Path(path)
+    key = {
+        "version": CACHE_VERSION,
+        "name": path.name,
+        "signature": file_signature(path),
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def load(cache_dir, key):
+    """
+    Loads cached counts.
+
+    Args:
+        cache_dir (Path): The cache directory.
+        key (str): The key, from `cache_key`.
+
+    Returns:
+        The cached counts, or None if there are no cached counts for the key, or if
+        they can't be loaded.
+    """
+    try:
+        with open(Path(cache_dir) / f"{key}.pickle", "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return None
+
+
+def save(cache_dir, key, counts):
+    """
+    Saves counts to the cache.
+
+    The counts are written to a temporary file, which then replaces the cache entry,
+    so that an interrupted run never leaves a partial entry behind.
+
+    Args:
+        cache_dir (Path): The cache directory. It is created if it doesn't exist.
+        key (str): The key, from `cache_key`.
+        counts: The counts to cache.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(counts, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_dir / f"{key}.pickle")
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def iter_cached(paths, calculate, cache_dir=None, params=()):
+    """
+    Yields the counts for each input file, reusing cached counts where possible.
+
+    The cached counts are loaded one input file at a time, and then the counts for
+    the other input files are calculated. The counts for each input file are cached
+    as soon as they are calculated, so an interrupted run can be resumed.
+
+    Args:
+        paths (list): The paths to the input files.
+        calculate (callable): Given a list of paths, yields the path to each input file
+            and its counts.
+        cache_dir (Path, optional): The cache directory. Defaults to None, which
+            doesn't cache.
+        params (list, optional): The parameters that the counts are calculated with, as
+            for `cache_key`.
+
+    Yields:
+        tuple: The path to each input file and its counts, with the input files whose
+            counts were cached first.
+    """
+    uncached = list(paths)
+    if cache_dir is not None:
+        keys = {path: cache_key(path, *params) for path in paths}
+        uncached = []
+        for path in paths:
+            counts = load(cache_dir, keys[path])
+            if counts is None:
+                uncached.append(path)
+            else:
+                yield path, counts
+
+    for path, counts in calculate(uncached):
+        if cache_dir is not None:
+            save(cache_dir, keys[path], counts)
+        yield path, counts
+
+
+def calculate_cached(paths, calculate, cache_dir=None, params=()):
+    """
+    Calculates the counts for each input file, reusing cached counts where possible.
+
+    Args:
+        paths (list): The paths to the input files.
+        calculate (callable): See `iter_cached`.
+        cache_dir (Path, optional): See `iter_cached`.
+        params (list, optional): See `iter_cached`.
+
+    Returns:
+        dict: The counts for each input file.
+    """
+    return dict(iter_cached(paths, calculate, cache_dir, params))
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_array(values):
+    """Returns values as a NumPy array, inferring a numeric dtype for object data."""
+    if isinstance(values, pd.Series):
+        # An object column of Python ints is inferred as int64, as `Series.apply`
+        # would, so that the kernels don't fall back to object arithmetic.
+        return values.infer_objects().to_numpy()
+    return np.asarray(values)
+
+
+def _like(values, result):
+    """Wraps result in a Series aligned with values, if values is a Series."""
+    if isinstance(values, pd.Series):
+        return pd.Series(result, index=values.index, name=values.name)
+    return result
+
+
+def redact(values, threshold=10):
+    """Replaces values less than threshold with 0.
+
+    Args:
+        values: A scalar, array or Series of counts.
+        threshold: Values less than this are redacted.
+
+    Returns:
+        The redacted values, with the same shape as values.
+    """
+    array = _as_array(values)
+    return _like(values, np.where(array >= threshold, array, 0))
+
+
+def round_to_nearest(values, decimals=-1):
+    """Rounds values to a negative number of decimals, as the `round` builtin does.
+
+    `Series.round` and `np.round` scale by a power of ten in floating-point, which
+    introduces precision errors, meaning some numbers aren't rounded. Instead, we use
+    integer division so that halves are rounded to even exactly, like `round`.
+
+    Args:
+        values: A scalar, array or Series of integer-valued counts.
+        decimals: The number of decimals to round to. Must not be positive.
+
+    Returns:
+        The rounded values, with the same shape as values.
+    """
+    if decimals > 0:
+        raise ValueError("decimals must not be positive")
+
+    array = _as_array(values)
+    base = 10**-decimals
+    quotient = array // base
+    remainder = array % base
+    round_up = (2 * remainder > base) | ((2 * remainder == base) & (quotient % 2 == 1))
+    return _like(values, (quotient + round_up) * base)
+
+
+def redact_and_round(values, decimals=-1, threshold=10):
+    """Redacts values less than threshold and then rounds to decimals.
+
+    Args:
+        values: A scalar, array or Series of integer-valued counts.
+        decimals: The number of decimals to round to. Must not be positive.
+        threshold: Values less than this are redacted.
+
+    Returns:
+        The redacted and rounded values, with the same shape as values.
+    """
+    return round_to_nearest(redact(values, threshold=threshold), decimals=decimals)
+
+
+def round_to_base(values, base=5):
+    """Rounds values to the nearest multiple of base, keeping missing values.
+
+    This is `base * round(x / base)`, so halves are rounded to even. When there are no
+    missing values, the rounded values are integers.
+
+    Args:
+        values: A scalar, array or Series of counts.
+        base: The base to round to.
+
+    Returns:
+        The rounded values, with the same shape as values.
+    """
+    array = _as_array(values).astype(float)
+    rounded = base * np.rint(array / base)
+    if not np.isnan(rounded).any():
+        rounded = rounded.astype(np.int64)
+    return _like(values, rounded)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_extension_array_dtype
+
+
+class DistinctCounter:
+    """
+    Counts the distinct values of IDs that are added in chunks, such as a month at a
+    time.
+
+    The distinct values seen so far are kept as a sorted array, and each chunk is
+    merged into it. Memory is proportional to the number of distinct values, rather
+    than to the number of values added. As with `np.unique` on floats, missing values
+    are counted as a single distinct value.
+    """
+
+    def __init__(self):
+        self.values = np.array([], dtype=np.int64)
+        self.has_missing = False
+
+    def update(self, values):
+        """
+        Add a chunk of values.
+
+        Args:
+            values (array-like): The values to add, such as the unique IDs in a month.
+        """
+        values = pd.Series(values)
+        missing = values.isna()
+        self.has_missing = self.has_missing or bool(missing.any())
+        values = values[~missing]
+        if is_extension_array_dtype(values.dtype):
+            values = values.astype(values.dtype.numpy_dtype)
+        self.values = np.union1d(self.values, values.to_numpy())
+
+    def __len__(self):
+        return len(self.values) + self.has_missing
@@ -0,0 +1,137 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_extension_array_dtype,
+    is_integer_dtype,
+    is_object_dtype,
+)
+
+
+# The demographics from demographics.py and study_definition_ethnicity.py, and the
+# codes from event_variables.py
+CATEGORICAL_COLUMNS = [
+    "sex",
+    "region",
+    "imd",
+    "age",
+    "ethnicity",
+    "event_1_code",
+    "event_2_code",
+]
+FLAG_COLUMNS = ["event_1", "event_2", "event_measure"]
+ID_COLUMNS = ["patient_id", "practice"]
+
+
+def to_categorical(column):
+    """
+    Convert a column of strings to a categorical.
+
+    The measures count every category of a categorical column, so the categories are
+    the values in the column, sorted. This means that the groups are the same as those
+    of the column of strings. A column that is already categorical is unchanged.
+    """
+    if not is_object_dtype(column.dtype):
+        return column
+    return column.astype("category")
+
+
+def to_flag(column):
+    """
+    Convert a column of integer flags to a bool, or to the smallest unsigned int.
+
+    Columns with missing or negative values are unchanged.
+    """
+    if not is_integer_dtype(column.dtype) or column.isna().any():
+        return column
+    if column.empty or column.min() < 0:
+        return column
+    if column.max() <= 1:
+        return column.astype(bool)
+    return column.astype(np.min_scalar_type(column.max()))
+
+
+def to_int32(column):
+    """Convert a column of integer IDs to int32, if the IDs fit."""
+    if not is_integer_dtype(column.dtype):
+        return column
+    info = np.iinfo(np.int32)
+    ids = column.dropna()
+    if not ids.empty and (ids.min() < info.min or ids.max() > info.max):
+        return column
+    # A nullable column (Int64) stays nullable
+    return column.astype(
+        "Int32" if is_extension_array_dtype(column.dtype) else np.int32
+    )
+
+
+def compact_dtypes(df):
+    """
+    Convert the columns of a cohort DataFrame to compact dtypes.
+
+    Demographics and codes become categoricals, flags become bools (or small unsigned
+    ints), and IDs become int32 where they fit. Other columns are unchanged.
+
+    Args:
+        df (pd.DataFrame): A cohort DataFrame.
+
+    Returns:
+        pd.DataFrame: A copy of the DataFrame with compact dtypes.
+    """
+    policy = [
+        (CATEGORICAL_COLUMNS, to_categorical),
+        (FLAG_COLUMNS, to_flag),
+        (ID_COLUMNS, to_int32),
+    ]
+    converted = {}
+    for columns, convert in policy:
+        for column in columns:
+            if column in df.columns:
+                converted[column] = convert(df[column])
+    return df.assign(**converted)
+
+
+def memory_report(before, after):
+    """
+    Compare the memory used by each column of a DataFrame before and after conversion.
+
+    Args:
+        before (pd.DataFrame): The DataFrame before conversion.
+        after (pd.DataFrame): The DataFrame after conversion.
+
+    Returns:
+        pd.DataFrame: A DataFrame indexed by column, with the dtype and the bytes used
+                      by each column before and after, and a total row.
+    """
+    report = pd.DataFrame(
+        {
+            "dtype_before": before.dtypes.astype(str),
+            "dtype_after": after.dtypes.astype(str),
+            "bytes_before": before.memory_usage(index=False, deep=True),
+            "bytes_after": after.memory_usage(index=False, deep=True),
+        }
+    )
+    report.loc["total"] = ["", "", *report[["bytes_before", "bytes_after"]].sum()]
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Report the memory used by cohort files before and after conversion"
+    )
+    parser.add_argument("paths", type=Path, nargs="+", help="cohort files to report on")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    for path in args.paths:
+        df = pd.read_feather(path)
+        print(path)
+        print(memory_report(df, compact_dtypes(df)).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,11 @@
 import argparse
 import functools
-from pathlib import Path
 
-import numpy as np
 import pandas as pd
-from analysis.report_utils import (
-    drop_zero_practices,
-    get_date_input_file,
-    match_input_files,
-    save_to_json,
-)
+from analysis import catalog, disclosure
+from analysis.cohorts import iter_cohorts, read_cohort
+from analysis.distinct import DistinctCounter
+from analysis.report_utils import save_to_json
 
 
 def redact_and_round(x, *, base):
@@ -24,9 +20,7 @@ def redact_and_round(x, *, base):
     else:
         decimals = -2
 
-    x = x if x >= 10 else 0
-    x = round(x, ndigits=decimals)
-    return int(x)
+    return int(disclosure.redact_and_round(x, decimals=decimals))
 
 
 redact_and_round_to_nearest_100 = functools.partial(redact_and_round, base=100)
@@ -76,38 +70,39 @@ def generate_latest_week_range(latest_week_start):
     return latest_week_range
 
 
-def main():
-    args = parse_args()
-
-    patients = []
-    patients_with_events = []
-    practices = []
-    practice_with_events = []
-    events = {}
-    events_weekly = {}
-
-    for file in Path(args.input_dir).rglob("*"):
-        if match_input_files(file.name):
-            date = get_date_input_file(file.name)
-            df = pd.read_feather(file)
-            df["date"] = date
-
-            df_practices_dropped = drop_zero_practices(df, "event_measure")
-
-            summary_stats = get_summary_stats(df, df_practices_dropped)
-            events[date] = summary_stats["num_events"]
-            patients.extend(summary_stats["unique_patients"])
-            patients_with_events.extend(summary_stats["patients_with_events"])
-            practices.extend(summary_stats["unique_practices"])
-            practice_with_events.extend(summary_stats["unique_practices_with_events"])
-
-        if match_input_files(file.name, weekly=True):
-            date = get_date_input_file(file.name, weekly=True)
-            df = pd.read_feather(file)
-            df["date"] = date
-            num_events = df.loc[:, "event_measure"].sum()
-            events_weekly[date] = num_events
+def event_rows(df):
+    """
+    Select the rows with an event at a known practice.
 
+    Their practices are the practices that `drop_zero_practices` keeps, so they can be
+    passed to `get_summary_stats` instead, without grouping by practice.
+    """
+    has_event = df["event_measure"].fillna(0).astype(bool) & df["practice"].notna()
+    return df.loc[has_event, :]
+
+
+def summarise_event_counts(
+    events,
+    events_weekly,
+    patients,
+    patients_with_events,
+    practices,
+    practice_with_events,
+):
+    """
+    Summarise the event counts, with disclosure control.
+
+    Args:
+        events (dict): The number of events for each month.
+        events_weekly (dict): The number of events for each week.
+        patients (DistinctCounter): The patients.
+        patients_with_events (DistinctCounter): The patients with events.
+        practices (DistinctCounter): The practices.
+        practice_with_events (DistinctCounter): The practices with events.
+
+    Returns:
+        dict: The summary, as written to event_counts.json.
+    """
     # there should only be one key in events_weekly, but we take the max anyway
     latest_week = max(events_weekly.keys())
     latest_month = max(events.keys())
@@ -119,32 +114,85 @@ def main():
         redact_and_round_to_nearest_100(sum(events.values()))
     )
     total_patients = replace_zero_with_redacted(
-        redact_and_round_to_nearest_100(len(np.unique(patients)))
+        redact_and_round_to_nearest_100(len(patients))
     )
     unique_patients_with_events = replace_zero_with_redacted(
-        redact_and_round_to_nearest_100(len(np.unique(patients_with_events)))
+        redact_and_round_to_nearest_100(len(patients_with_events))
     )
 
-    total_practices = redact_and_round_to_nearest_10(len(np.unique(practices)))
+    total_practices = redact_and_round_to_nearest_10(len(practices))
     total_practices_with_events = redact_and_round_to_nearest_10(
-        len(np.unique(practice_with_events))
+        len(practice_with_events)
     )
     events_in_latest_period = replace_zero_with_redacted(
         redact_and_round_to_nearest_100(events[max(events.keys())])
     )
 
+    return {
+        "total_events": total_events,
+        "total_patients": total_patients,
+        "unique_patients_with_events": unique_patients_with_events,
+        "events_in_latest_period": events_in_latest_period,
+        "total_practices": total_practices,
+        "total_practices_with_events": total_practices_with_events,
+        "events_in_latest_week": events_in_latest_week,
+        "latest_week": generate_latest_week_range(latest_week),
+        "latest_month": pd.to_datetime(latest_month).strftime("%Y-%m"),
+    }
+
+
+def count_weekly_events(weekly_files):
+    """
+    Count the events in each weekly cohort file.
+
+    Args:
+        weekly_files (list): The weekly CohortFiles, from `catalog.select`.
+
+    Returns:
+        dict: The number of events for the week of each cohort file.
+    """
+    events_weekly = {}
+    for cohort_file in weekly_files:
+        df = read_cohort(cohort_file.path, columns=["event_measure"])
+        events_weekly[cohort_file.date] = df.loc[:, "event_measure"].sum()
+    return events_weekly
+
+
+def main():
+    args = parse_args()
+
+    patients = DistinctCounter()
+    patients_with_events = DistinctCounter()
+    practices = DistinctCounter()
+    practice_with_events = DistinctCounter()
+    events = {}
+
+    # The joined file for each month, if there is one, and otherwise the raw file
+    cohort_files = catalog.discover(args.input_dir)
+    monthly_files = {f.path: f.date for f in catalog.select(cohort_files)}
+    events_weekly = count_weekly_events(catalog.select(cohort_files, weekly=True))
+
+    for file, df in iter_cohorts(
+        list(monthly_files), columns=["patient_id", "event_measure", "practice"]
+    ):
+        date = monthly_files[file]
+
+        summary_stats = get_summary_stats(df, event_rows(df))
+        events[date] = summary_stats["num_events"]
+        patients.update(summary_stats["unique_patients"])
+        patients_with_events.update(summary_stats["patients_with_events"])
+        practices.update(summary_stats["unique_practices"])
+        practice_with_events.update(summary_stats["unique_practices_with_events"])
+
     save_to_json(
-        {
-            "total_events": total_events,
-            "total_patients": total_patients,
-            "unique_patients_with_events": unique_patients_with_events,
-            "events_in_latest_period": events_in_latest_period,
-            "total_practices": total_practices,
-            "total_practices_with_events": total_practices_with_events,
-            "events_in_latest_week": events_in_latest_week,
-            "latest_week": generate_latest_week_range(latest_week),
-            "latest_month": pd.to_datetime(latest_month).strftime("%Y-%m"),
-        },
+        summarise_event_counts(
+            events,
+            events_weekly,
+            patients,
+            patients_with_events,
+            practices,
+            practice_with_events,
+        ),
         f"{args.output_dir}/event_counts.json",
     )
 
@@ -0,0 +1,115 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+
+# Change this when the way that figures are drawn changes outside the module of the
+# function that draws them, such as the style that plot_measures sets, so that existing
+# figures are drawn again
+MANIFEST_VERSION = 1
+
+
+def frame_digest(df):
+    """Calculates the SHA-256 digest of the columns, dtypes and values of a DataFrame."""
+    digest = hashlib.sha256()
+    digest.update(
+        json.dumps([[str(c) for c in df.columns], [str(d) for d in df.dtypes]]).encode()
+    )
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@functools.cache
+def source_digest(function):
+    """
+    Calculates the SHA-256 digest of the source of the module that defines a function.
+
+    The module's source includes the function's, and that of the helpers in the same
+    module that it draws with.
+    """
+    source = inspect.getsource(inspect.getmodule(function))
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def figure_hash(function, kwargs):
+    """
+    Creates the hash of a figure, from what it is drawn with.
+
+    The hash depends on the function that draws the figure, including its source, and
+    on its arguments: the data and the styling parameters.
+
+    Args:
+        function (callable): The function that draws the figure.
+        kwargs (dict): The arguments of the function. DataFrames are hashed by
+            content, and other arguments must be serialisable as JSON, or have a
+            string representation that identifies them (such as a Path).
+
+    Returns:
+        str: The hash.
+    """
+    params = {
+        name: frame_digest(value) if isinstance(value, pd.DataFrame) else value
+        for name, value in kwargs.items()
+    }
+    key = {
+        "version": MANIFEST_VERSION,
+        "function": function.__name__,
+        "source": source_digest(function),
+        "params": params,
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def load(manifest_path):
+    """
+    Loads a manifest of the hashes of figures.
+
+    Args:
+        manifest_path (Path): The path to the manifest.
+
+    Returns:
+        dict: A dictionary where keys are the names of figures and values are their
+            hashes. It is empty if there is no manifest, or if it can't be loaded.
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception:
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def save(manifest_path, manifest):
+    """
+    Saves a manifest of the hashes of figures.
+
+    The manifest is written to a temporary file, which then replaces the manifest, so
+    that an interrupted run never leaves a partial manifest behind.
+
+    Args:
+        manifest_path (Path): The path to the manifest.
+        manifest (dict): See `load`.
+    """
+    manifest_path = Path(manifest_path)
+    fd, tmp_path = tempfile.mkstemp(dir=manifest_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def is_current(path, manifest, digest):
+    """Whether a figure exists, and was drawn with the data and styling of its hash."""
+    path = Path(path)
+    return path.exists() and manifest.get(path.name) == digest
@@ -0,0 +1,142 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+
+REDACTED = "[Redacted]"
+
+COLUMNS = [
+    "group",
+    "group_value",
+    "value",
+    "date",
+    "event_measure",
+    "population",
+    "redacted",
+]
+
+
+def to_store_frames(measure_df):
+    """
+    Convert a measure table to the typed table of each group, as it is stored.
+
+    Group values are strings (or missing, if they are empty), as they are when
+    measure_all.csv is read, dates are datetimes, and redacted values are missing and
+    flagged in a "redacted" column.
+
+    Args:
+        measure_df (pd.DataFrame): A measure table, as returned by
+            `measures.calculate_and_redact_values`.
+
+    Returns:
+        dict: A dict where keys are the groups, in the order that they appear in the
+            measure table, and values are their tables.
+    """
+    frames = {}
+    for group, df in measure_df.groupby("group", sort=False):
+        redacted = df["value"].eq(REDACTED)
+        group_value = df["group_value"].astype(str)
+        frames[group] = pd.DataFrame(
+            {
+                "group_value": group_value.mask(group_value.eq("")),
+                "value": df["value"].mask(redacted).astype(float),
+                "date": pd.to_datetime(df["date"]),
+                "event_measure": pd.to_numeric(df["event_measure"]),
+                "population": pd.to_numeric(df["population"]),
+                "redacted": redacted,
+            }
+        ).reset_index(drop=True)
+    return frames
+
+
+def write_measures(measure_df, store_dir):
+    """
+    Write a measure table to a store with a Feather file for each group.
+
+    Each group is stored as it is converted by `to_store_frames`. The groups are listed
+    in groups.json, in the order that they appear in the measure table.
+
+    Args:
+        measure_df (pd.DataFrame): A measure table, as returned by
+            `measures.calculate_and_redact_values`.
+        store_dir (Path): The directory to write the store to. It is created if it
+            doesn't exist.
+
+    Returns:
+        dict: The table of each group, as returned by `to_store_frames`, so that
+            they can be used without reading the store.
+    """
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    frames = to_store_frames(measure_df)
+    for group, df in frames.items():
+        df.to_feather(store_dir / f"{group}.feather")
+
+    with open(store_dir / "groups.json", "w") as f:
+        json.dump(list(frames), f)
+    return frames
+
+
+def list_groups(store_dir):
+    """Lists the groups in a store, in the order that they were written."""
+    with open(Path(store_dir) / "groups.json") as f:
+        return json.load(f)
+
+
+def read_measures(store_dir, groups=None):
+    """
+    Read groups from a store, reading only the Feather files for those groups.
+
+    Args:
+        store_dir (Path): The directory of the store.
+        groups (list, optional): The groups to read. Groups that aren't in the store
+            are ignored. Defaults to all groups.
+
+    Returns:
+        pd.DataFrame: A measure table with the columns of measure_all.csv, and a
+            "redacted" column. The "value" column is missing where the value is
+            redacted. The groups are in the order that they were written.
+    """
+    store_dir = Path(store_dir)
+    stored = list_groups(store_dir)
+    if groups is None:
+        groups = stored
+    return select_measures(
+        {
+            group: pd.read_feather(store_dir / f"{group}.feather")
+            for group in stored
+            if group in groups
+        }
+    )
+
+
+def select_measures(frames, groups=None):
+    """
+    Select groups from the tables of a store's groups, as `read_measures` does.
+
+    Args:
+        frames (dict): The table of each group, as returned by `write_measures`.
+        groups (list, optional): See `read_measures`.
+
+    Returns:
+        pd.DataFrame: See `read_measures`.
+    """
+    if groups is None:
+        groups = list(frames)
+    frames = [df.assign(group=group) for group, df in frames.items() if group in groups]
+    if not frames:
+        return pd.DataFrame(columns=COLUMNS)
+    return pd.concat(frames, ignore_index=True)[COLUMNS]
+
+
+def to_measure_table(df):
+    """
+    Convert a measure table read from a store to the layout of measure_all.csv.
+
+    Redacted values are replaced with "[Redacted]", and the "redacted" column is
+    dropped.
+    """
+    value = df["value"].astype(object).mask(df["redacted"], REDACTED)
+    return df.assign(value=value).drop(columns="redacted")
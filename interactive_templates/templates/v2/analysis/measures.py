@@ -1,16 +1,54 @@
 import argparse
+import functools
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from analysis.report_utils import calculate_rate, get_date_input_file, match_input_files
+from analysis import catalog, cohorts, counts_cache, dtypes
+from analysis.cohorts import (
+    call_with_worker_lookup,
+    estimate_size,
+    init_worker,
+    iter_cohort_batches,
+    iter_cohorts,
+    read_cohort,
+    read_lookup,
+    worker_budget,
+    worker_initargs,
+)
+from analysis.disclosure import redact_and_round
+from analysis.measure_store import write_measures
+from analysis.report_utils import calculate_rate, get_date_input_file
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_object_dtype
+
+
+MEASURE_COLUMNS = ["date", "event_measure", "population", "group", "group_value"]
+
+# Counted as well as the demographic breakdowns that are passed as arguments
+DEFAULT_BREAKDOWNS = ["practice", "event_1_code", "event_2_code"]
+
+FILTERS = {
+    "sex": ["M", "F"],
+    "age_band": [
+        "0-5",
+        "6-10",
+        "11-17",
+        "18-29",
+        "30-39",
+        "40-49",
+        "50-59",
+        "60-69",
+        "70-79",
+        "80+",
+    ],
+}
 
 
 def redact_and_round_column(df, col, decimals=-1):
     """Redact values less-than or equal-to 10 and then round values to nearest 10."""
-    df[col] = df[col].apply(lambda x: x if x >= 10 else 0)
-    # `Series.round` introduces scaling and precision errors, meaning some numbers
-    # aren't rounded. This isn't the case for the `round` builtin.
-    df[col] = df[col].apply(round, ndigits=decimals)
+    df[col] = redact_and_round(df[col], decimals=decimals)
     return df
 
 
@@ -94,39 +132,128 @@ def calculate_group_counts(df, breakdown, date):
     return counts
 
 
-def calculate_and_redact_values(df):
+def encode_groups(column):
     """
-    Calculate the values for each group and redact where necessary.
+    Encode a column as integer codes for the groups that `groupby` would create.
 
     Args:
-        df (pd.DataFrame): The input DataFrame. Should contain columns "event_measure", "population" and "group".
+        column (pd.Series): The column to group by.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the calculated values.
+        tuple: An array of the group code for each row (-1 where the value is missing),
+               and an array of the group values, in `groupby` order. For a
+               categorical column, every category is a group, even if unobserved.
+               Otherwise, the groups are the sorted unique values.
     """
-    groups = df["group"].unique()
-    result = pd.DataFrame(columns=["group", "group_value", "value"])
-    for group in groups:
-        group_df = df.loc[df["group"] == group, :]
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        groups = pd.Categorical.from_codes(
+            np.arange(len(column.cat.categories)), dtype=column.dtype
+        )
+        return column.cat.codes.to_numpy(), groups
+    return pd.factorize(column.array, sort=True)
 
-        if group == "practice":
-            group_df.loc[:, "value"] = calculate_rate(
-                group_df, "event_measure", "population"
-            )
-        else:
-            group_df = redact_and_round_column(group_df, "event_measure", decimals=-1)
-            group_df = redact_and_round_column(group_df, "population", decimals=-1)
-            group_df.loc[:, "value"] = calculate_rate(
-                group_df, "event_measure", "population"
-            )
-            group_df.loc[
-                (group_df["event_measure"] == 0) | (group_df["population"] == 0),
-                "value",
-            ] = "[Redacted]"
 
-        result = pd.concat([result, group_df], ignore_index=True)
+def calculate_all_counts(df, breakdowns, date):
+    """
+    Calculate the total counts and the counts for each breakdown in a single pass.
+
+    Each breakdown is encoded once as integer codes, and the counts for every group
+    are then summed with `np.bincount`, rather than grouping the DataFrame once per
+    breakdown.
+
+    Args:
+        df (pd.DataFrame): The input DataFrame. Should contain a column named
+                           "event_measure" and a column for each breakdown.
+        breakdowns (list): The names of the columns to group by.
+        date (str): The date of the input file.
+
+    Returns:
+        list: A list of DataFrames containing the total counts followed by the counts
+              for each breakdown, with the same rows as `calculate_total_counts` and
+              `calculate_group_counts`.
+    """
+    event_measure = df["event_measure"]
+    # `groupby` sums and counts both skip missing values
+    counted = event_measure.notna().to_numpy()
+    weights = event_measure.fillna(0).to_numpy(dtype=float)
+    is_integer = is_bool_dtype(event_measure.dtype) or is_integer_dtype(
+        event_measure.dtype
+    )
+
+    def to_counts(sums, populations, group, group_values):
+        if is_integer:
+            sums = sums.astype(np.int64)
+        return pd.DataFrame(
+            {
+                "date": date,
+                "event_measure": sums,
+                "population": populations.astype(np.int64),
+                "group": group,
+                "group_value": group_values,
+            }
+        )
+
+    counts = [
+        to_counts(
+            np.array([weights.sum()]),
+            np.array([counted.sum()]),
+            "total",
+            ["total"],
+        )
+    ]
+    for breakdown in breakdowns:
+        codes, groups = encode_groups(df[breakdown])
+        in_group = codes >= 0
+        sums = np.bincount(
+            codes[in_group], weights=weights[in_group], minlength=len(groups)
+        )
+        populations = np.bincount(codes[in_group & counted], minlength=len(groups))
+        counts.append(to_counts(sums, populations, breakdown, groups))
+    return counts
+
+
+def calculate_and_redact_values(df):
+    """
+    Calculate the values for each group and redact where necessary.
+
+    The counts of every group except "practice" are redacted and rounded, and then the
+    values of every row are calculated at once, rather than group by group.
 
-    return result
+    Args:
+        df (pd.DataFrame): The input DataFrame. Should contain columns "event_measure", "population" and "group".
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the calculated values, with the rows of
+                      each group together, in order of appearance.
+    """
+    codes, _ = pd.factorize(df["group"])
+    order = np.argsort(codes, kind="stable")
+    result = df.iloc[order[codes[order] >= 0]].reset_index(drop=True)
+
+    redacted = result["group"].ne("practice")
+    for column in ["event_measure", "population"]:
+        counts = result[column].infer_objects()
+        result[column] = counts.mask(redacted, redact_and_round(counts, decimals=-1))
+
+    value = calculate_rate(result, "event_measure", "population").astype(object)
+    value.loc[
+        redacted & (result["event_measure"].eq(0) | result["population"].eq(0))
+    ] = "[Redacted]"
+    result["value"] = value
+
+    # The counts keep the types that they had when each group was concatenated onto
+    # an empty frame, so that they are written as before: floats (e.g. "110.0"),
+    # except that if the counts are objects, the counts of "practice" and of the
+    # groups after it keep their own types.
+    after_practice = result["group"].eq("practice").cummax()
+    for column in ["event_measure", "population"]:
+        counts = result[column].astype(float)
+        if is_object_dtype(df[column].dtype) and after_practice.any():
+            counts = counts.astype(object).mask(after_practice, result[column])
+        result[column] = counts
+
+    columns = ["group", "group_value", "value"]
+    return result[columns + [c for c in result.columns if c not in columns]]
 
 
 def drop_redacted_rows(measure_df):
@@ -139,79 +266,328 @@ def drop_redacted_rows(measure_df):
     Returns:
         pd.DataFrame: A measure DataFrame where subgroups with >50% redacted values have been removed.
     """
+    group_value = measure_df["group_value"]
+    by_group_value = {"by": group_value, "sort": False, "dropna": False}
+    redacted_count = (
+        measure_df["value"].eq("[Redacted]").groupby(**by_group_value).transform("sum")
+    )
+    total_count = measure_df["value"].notna().groupby(**by_group_value).transform("sum")
+    # Missing group values are never dropped
+    drop = (redacted_count / total_count > 0.5) & group_value.notna()
+    return measure_df.loc[~drop, :]
 
-    for group_value in measure_df["group_value"].unique():
-        group_value_df = measure_df.loc[measure_df["group_value"] == group_value, :]
-        redacted_count = group_value_df.loc[group_value_df["value"] == "[Redacted]", :][
-            "value"
-        ].count()
-        total_count = group_value_df["value"].count()
-        if redacted_count / total_count > 0.5:
-            measure_df = measure_df.loc[measure_df["group_value"] != group_value, :]
 
-    return measure_df
+def merge_counts(batch_counts, breakdowns, date):
+    """
+    Merge the counts for batches of an input file into the counts for the whole file.
 
+    Args:
+        batch_counts (list): The lists of DataFrames returned by `calculate_all_counts`
+                             for each batch.
+        breakdowns (list): The names of the columns that were grouped by.
+        date (str): The date of the input file.
 
-def parse_args():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--breakdowns", action="append", default=[], required=False)
-    parser.add_argument("--input-dir", type=Path, required=True)
-    parser.add_argument("--output-dir", type=Path, required=True)
-    return parser.parse_args()
+    Returns:
+        list: A list of DataFrames containing the total counts followed by the counts
+              for each breakdown, as `calculate_all_counts` would return for the whole
+              file.
+    """
+    if len(batch_counts) == 1:
+        return batch_counts[0]
+
+    merged_counts = []
+    for group, counts in zip(["total", *breakdowns], zip(*batch_counts)):
+        merged = pd.concat(counts, ignore_index=True)
+        # The groups are sorted, as for a column of strings. If the batches share a
+        # categorical dtype, then the concatenated column is categorical, and the
+        # groups are in the order of its categories.
+        codes, groups = pd.factorize(merged["group_value"], sort=True)
+        sums = np.bincount(
+            codes,
+            weights=merged["event_measure"].to_numpy(dtype=float),
+            minlength=len(groups),
+        )
+        if all(is_integer_dtype(c["event_measure"].dtype) for c in counts):
+            sums = sums.astype(np.int64)
+        populations = np.bincount(
+            codes,
+            weights=merged["population"].to_numpy(dtype=float),
+            minlength=len(groups),
+        )
+        merged_counts.append(
+            pd.DataFrame(
+                {
+                    "date": date,
+                    "event_measure": sums,
+                    "population": populations.astype(np.int64),
+                    "group": group,
+                    "group_value": groups,
+                }
+            )
+        )
+    return merged_counts
 
 
-def main():
-    args = parse_args()
-    breakdowns = args.breakdowns
+def calculate_file_counts(path, breakdowns, memory_budget=None, lookup=None):
+    """
+    Calculate the total counts and the counts for each breakdown for an input file.
 
-    breakdowns.extend(["practice", "event_1_code", "event_2_code"])
+    Only the needed columns are read, and rows are filtered by `FILTERS` as the input
+    file is read. If the input file needs more memory than the budget, then it is read
+    in batches that fit in the budget, and the counts for each batch are merged.
 
-    measure_df = pd.DataFrame(
-        columns=["date", "event_measure", "population", "group", "group_value"]
+    Args:
+        path (Path): The path to the input file.
+        breakdowns (list): The names of the columns to group by.
+        memory_budget (int, optional): The memory, in bytes, to read the input file in.
+                                       Defaults to None, which reads the whole file.
+        lookup (Lookup, optional): A lookup to join breakdowns that aren't in the
+                                     input file from, as for `cohorts.read_cohort`.
+
+    Returns:
+        list: A list of DataFrames containing the total counts followed by the counts
+              for each breakdown.
+    """
+    columns = ["event_measure", *breakdowns]
+    date = get_date_input_file(path.name)
+    if memory_budget is not None:
+        num_rows, row_bytes = estimate_size(path, [*columns, *FILTERS])
+        if num_rows * row_bytes > memory_budget:
+            batches = iter_cohort_batches(
+                path,
+                columns=columns,
+                filters=FILTERS,
+                batch_size=max(memory_budget // row_bytes, 1),
+                lookup=lookup,
+            )
+            return merge_counts(
+                [calculate_all_counts(df, breakdowns, date) for df in batches],
+                breakdowns,
+                date,
+            )
+
+    df = read_cohort(path, columns=columns, filters=FILTERS, lookup=lookup)
+    return calculate_all_counts(df, breakdowns, date)
+
+
+def concat_counts(file_counts):
+    """
+    Concatenate the counts for each input file into a single DataFrame.
+
+    Args:
+        file_counts (iterable): The lists of DataFrames returned by
+                                `calculate_all_counts` for each input file.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing all the counts, in order.
+    """
+    # Concatenate once, starting from an empty frame, so that the columns have the
+    # same (object) dtypes as when the counts were concatenated one by one.
+    return pd.concat(
+        [
+            pd.DataFrame(columns=MEASURE_COLUMNS),
+            *itertools.chain.from_iterable(file_counts),
+        ],
+        ignore_index=True,
     )
 
-    for file in Path(args.input_dir).iterdir():
-        if match_input_files(file.name):
-            filters = {
-                "sex": ["M", "F"],
-                "age_band": [
-                    "0-5",
-                    "6-10",
-                    "11-17",
-                    "18-29",
-                    "30-39",
-                    "40-49",
-                    "50-59",
-                    "60-69",
-                    "70-79",
-                    "80+",
-                ],
-            }
-            date = get_date_input_file(file.name)
-            file_path = str(file.absolute())
-            df = pd.read_feather(file_path).pipe(filter_data, filters).assign(date=date)
 
-            total_count = calculate_total_counts(
-                df, date, group="total", group_value="total"
-            )
+def iter_file_counts(paths, breakdowns, workers=1, memory_budget=None, lookup=None):
+    """
+    Calculate the counts for each input file, in a pool of worker processes.
 
-            measure_df = pd.concat([measure_df, total_count], ignore_index=True)
+    Args:
+        paths (list): The paths to the input files.
+        breakdowns (list): The names of the columns to group by.
+        workers (int): The number of worker processes. Defaults to 1, which calculates
+                       the counts in this process, while the next input file is read
+                       in the background.
+        memory_budget (int, optional): The memory, in bytes, to read the input files
+                                       in. It is shared between the workers, less the
+                                       copies of the lookup, as by
+                                       `cohorts.worker_budget`, and the next input file
+                                       isn't read in the background. See
+                                       `calculate_file_counts`.
+        lookup (Lookup, optional): See `calculate_file_counts`.
+
+    Yields:
+        tuple: The path to each input file and its counts, in the order of paths.
+    """
+    memory_budget = worker_budget(memory_budget, workers, lookup)
+    if workers > 1:
+        # Each worker reads the lookup once, rather than being sent it for each file
+        calculate = functools.partial(
+            call_with_worker_lookup,
+            calculate_file_counts,
+            breakdowns=breakdowns,
+            memory_budget=memory_budget,
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=worker_initargs(lookup),
+        ) as executor:
+            yield from zip(paths, executor.map(calculate, paths))
+    elif memory_budget is not None:
+        for path in paths:
+            yield path, calculate_file_counts(path, breakdowns, memory_budget, lookup)
+    else:
+        columns = ["event_measure", *breakdowns]
+        for path, df in iter_cohorts(
+            paths, columns=columns, filters=FILTERS, lookup=lookup
+        ):
+            date = get_date_input_file(path.name)
+            yield path, calculate_all_counts(df, breakdowns, date)
+
+
+def calculate_counts(
+    paths,
+    breakdowns,
+    workers=1,
+    memory_budget=None,
+    cache_dir=None,
+    lookup_path=None,
+):
+    """
+    Calculate the counts for each input file, reusing cached counts where possible.
 
-            for breakdown in breakdowns:
-                counts = calculate_group_counts(df, breakdown, date)
+    Args:
+        paths (list): The paths to the input files.
+        breakdowns (list): The names of the columns to group by.
+        workers (int): See `iter_file_counts`.
+        memory_budget (int, optional): See `iter_file_counts`.
+        cache_dir (Path, optional): A directory to cache the counts for each input file
+                                    in. Input files whose name, size and modification
+                                    time are unchanged since they were cached are not
+                                    read again.
+                                    The counts for each input file are cached as soon
+                                    as they are calculated, so an interrupted run can
+                                    be resumed. The job-runner doesn't keep files that
+                                    aren't declared outputs, so the cache only lasts
+                                    between runs of the script by hand, such as
+                                    against a large set of dummy cohort files.
+                                    Defaults to None, which doesn't cache.
+        lookup_path (Path, optional): A lookup, such as the ethnicity cohort file, to
+                                      join breakdowns that aren't in the input files
+                                      from. It is read once. Defaults to None.
 
-                measure_df = pd.concat([measure_df, counts], ignore_index=True)
+    Returns:
+        pd.DataFrame: A DataFrame containing the counts for every input file, in the
+                      order of the input files.
+    """
+    lookup = None
+    params = [
+        breakdowns,
+        FILTERS,
+        counts_cache.source_digest(
+            cohorts,
+            dtypes,
+            calculate_file_counts,
+            merge_counts,
+            calculate_all_counts,
+            encode_groups,
+        ),
+    ]
+    if lookup_path is not None:
+        lookup = read_lookup(lookup_path, breakdowns)
+        # the counts depend on the lookup, as well as on the input file
+        params.append(counts_cache.file_signature(lookup_path))
+
+    file_counts = counts_cache.calculate_cached(
+        paths,
+        functools.partial(
+            iter_file_counts,
+            breakdowns=breakdowns,
+            workers=workers,
+            memory_budget=memory_budget,
+            lookup=lookup,
+        ),
+        cache_dir,
+        params,
+    )
+    return concat_counts(file_counts[path] for path in paths)
 
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--breakdowns", action="append", default=[], required=False)
+    parser.add_argument("--input-dir", type=Path, required=True)
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to read and count input files in",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        required=False,
+        help="memory, in MB, to read input files in; larger files are read in batches",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        required=False,
+        help="directory to cache the counts for each input file in, between runs "
+        "outside the job-runner",
+    )
+    parser.add_argument(
+        "--ethnicity-file",
+        type=Path,
+        required=False,
+        help="ethnicity cohort file to join the ethnicity of each patient from, if "
+        "the input files don't have it",
+    )
+    return parser.parse_args()
+
+
+def write_measure_outputs(measure_df, output_dir):
+    """
+    Calculate and redact the values of the counts, and write them.
+
+    Writes measure_all.csv, measure_practice_rate_deciles.csv, and the measure store.
+
+    Args:
+        measure_df (pd.DataFrame): The counts, as returned by `calculate_counts`.
+        output_dir (Path): The directory to write to.
+
+    Returns:
+        dict: The table of each group of the measure store, as returned by
+            `measure_store.write_measures`.
+    """
     # sort by date
 
     measure_df = measure_df.sort_values(by=["group", "group_value", "date"])
 
     measure_df = calculate_and_redact_values(measure_df)
-    measure_df.to_csv(args.output_dir / "measure_all.csv", index=False)
+    frames = write_measures(measure_df, output_dir / "measures")
+    measure_df.to_csv(output_dir / "measure_all.csv", index=False)
     measure_for_deciles = measure_df.loc[measure_df["group"] == "practice", :]
     measure_for_deciles.to_csv(
-        args.output_dir / "measure_practice_rate_deciles.csv", index=False
+        output_dir / "measure_practice_rate_deciles.csv", index=False
+    )
+    return frames
+
+
+def main():
+    args = parse_args()
+    breakdowns = [*args.breakdowns, *DEFAULT_BREAKDOWNS]
+
+    paths = [
+        cohort_file.path.absolute()
+        for cohort_file in catalog.select(catalog.discover(args.input_dir))
+    ]
+    memory_budget = args.memory_budget and args.memory_budget * 1024 * 1024
+    measure_df = calculate_counts(
+        paths,
+        breakdowns,
+        workers=args.workers,
+        memory_budget=memory_budget,
+        cache_dir=args.cache_dir,
+        lookup_path=args.ethnicity_file,
     )
+    write_measure_outputs(measure_df, args.output_dir)
 
 
 if __name__ == "__main__":
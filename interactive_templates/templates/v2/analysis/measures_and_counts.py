@@ -0,0 +1,294 @@
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from analysis import catalog, cohorts, counts_cache, dtypes
+from analysis.cohorts import (
+    call_with_worker_lookup,
+    estimate_size,
+    init_worker,
+    iter_cohort_view_batches,
+    iter_cohort_views,
+    read_cohort_views,
+    read_lookup,
+    worker_budget,
+    worker_initargs,
+)
+from analysis.distinct import DistinctCounter
+from analysis.event_counts import (
+    count_weekly_events,
+    event_rows,
+    get_summary_stats,
+    summarise_event_counts,
+)
+from analysis.measures import (
+    DEFAULT_BREAKDOWNS,
+    FILTERS,
+    calculate_all_counts,
+    concat_counts,
+    encode_groups,
+    merge_counts,
+    write_measure_outputs,
+)
+from analysis.report_utils import get_date_input_file, save_to_json
+
+
+# The columns that the event counts are of
+EVENT_COLUMNS = ["patient_id", "event_measure", "practice"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Calculate the measures and the event counts in a single scan"
+    )
+    parser.add_argument("--breakdowns", action="append", default=[], required=False)
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        required=True,
+        help="directory of the cohort files, and of the joined cohort files",
+    )
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument(
+        "--ethnicity-file",
+        type=Path,
+        required=False,
+        help="ethnicity cohort file to join the ethnicity of each patient from, if "
+        "the cohort files don't have it",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to read and count cohort files in",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        required=False,
+        help="memory, in MB, to read cohort files in; larger files are read in batches",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        required=False,
+        help="directory to cache the counts for each cohort file in, between runs "
+        "outside the job-runner",
+    )
+    return parser.parse_args()
+
+
+def count_events(df):
+    """Count the events of a cohort file, or of a batch of one."""
+    return get_summary_stats(df, event_rows(df))
+
+
+def calculate_file_results(path, breakdowns, memory_budget=None, lookup=None):
+    """
+    Calculate the event counts and the measure counts for a cohort file.
+
+    The event counts are of every row, and the measure counts are of the rows that
+    pass `FILTERS`. The file is read once. If it needs more memory than the budget,
+    then it is read in batches that fit in the budget, and both are counted from each
+    batch.
+
+    Args:
+        path (Path): The path to the cohort file.
+        breakdowns (list): The names of the columns to group by.
+        memory_budget (int, optional): The memory, in bytes, to read the cohort file
+            in. Defaults to None, which reads the whole file.
+        lookup (Lookup, optional): See `measures.calculate_file_counts`.
+
+    Returns:
+        tuple: A list of the event counts of each batch, as returned by
+            `count_events`, and the measure counts, as returned by
+            `calculate_all_counts`.
+    """
+    measure_columns = ["event_measure", *breakdowns]
+    views = [(EVENT_COLUMNS, None), (measure_columns, FILTERS)]
+    date = get_date_input_file(path.name)
+    if memory_budget is not None:
+        columns = [*EVENT_COLUMNS, *measure_columns, *FILTERS]
+        num_rows, row_bytes = estimate_size(path, columns)
+        if num_rows * row_bytes > memory_budget:
+            batch_stats = []
+            batch_counts = []
+            for df, measures_df in iter_cohort_view_batches(
+                path, views, max(memory_budget // row_bytes, 1), lookup
+            ):
+                batch_stats.append(count_events(df))
+                batch_counts.append(calculate_all_counts(measures_df, breakdowns, date))
+            return batch_stats, merge_counts(batch_counts, breakdowns, date)
+
+    df, measures_df = read_cohort_views(path, views, lookup)
+    return [count_events(df)], calculate_all_counts(measures_df, breakdowns, date)
+
+
+def iter_file_results(paths, breakdowns, workers=1, memory_budget=None, lookup=None):
+    """
+    Calculate the event counts and the measure counts for each cohort file.
+
+    Args:
+        paths (list): The paths to the cohort files.
+        breakdowns (list): The names of the columns to group by.
+        workers (int): The number of worker processes. Defaults to 1, which calculates
+            the counts in this process, while the next cohort file is read in the
+            background.
+        memory_budget (int, optional): The memory, in bytes, to read the cohort files
+            in. It is shared between the workers, less the copies of the lookup, as
+            by `cohorts.worker_budget`. The next cohort file isn't read in the
+            background, as both of its views would be held in memory. See
+            `calculate_file_results`.
+        lookup (Lookup, optional): See `calculate_file_results`.
+
+    Yields:
+        tuple: The path to each cohort file and what `calculate_file_results` returns
+            for it, in the order of paths.
+    """
+    memory_budget = worker_budget(memory_budget, workers, lookup)
+    if workers > 1:
+        # Each worker reads the lookup once, rather than being sent it for each file
+        calculate = functools.partial(
+            call_with_worker_lookup,
+            calculate_file_results,
+            breakdowns=breakdowns,
+            memory_budget=memory_budget,
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=worker_initargs(lookup),
+        ) as executor:
+            yield from zip(paths, executor.map(calculate, paths))
+    elif memory_budget is not None:
+        for path in paths:
+            yield path, calculate_file_results(path, breakdowns, memory_budget, lookup)
+    else:
+        views = [(EVENT_COLUMNS, None), (["event_measure", *breakdowns], FILTERS)]
+        for path, (df, measures_df) in iter_cohort_views(paths, views, lookup):
+            date = get_date_input_file(path.name)
+            yield path, (
+                [count_events(df)],
+                calculate_all_counts(measures_df, breakdowns, date),
+            )
+
+
+def measures_and_counts(
+    input_dir,
+    output_dir,
+    breakdowns,
+    ethnicity_file=None,
+    workers=1,
+    memory_budget=None,
+    cache_dir=None,
+):
+    """
+    Calculate the measures and the event counts, and write them.
+
+    Args:
+        input_dir (Path): The directory of the cohort files, and of the joined cohort
+            files.
+        output_dir (Path): The directory to write to.
+        breakdowns (list): The breakdowns to calculate the measures for, as well as
+            the default breakdowns.
+        ethnicity_file (Path, optional): The ethnicity cohort file, which is read once
+            and joined to each cohort file that doesn't have an ethnicity column, in
+            place of the joined cohort files. Defaults to None.
+        workers (int): See `iter_file_results`.
+        memory_budget (int, optional): See `iter_file_results`.
+        cache_dir (Path, optional): A directory to cache the counts for each cohort
+            file in, as for `measures.calculate_counts`. Defaults to None, which
+            doesn't cache.
+
+    Returns:
+        dict: The table of each group of the measure store, as returned by
+            `measure_store.write_measures`.
+    """
+    breakdowns = [*breakdowns, *DEFAULT_BREAKDOWNS]
+
+    # The joined file for each month, if there is one, and otherwise the raw file
+    cohort_files = catalog.discover(input_dir)
+    monthly_files = {f.path: f.date for f in catalog.select(cohort_files)}
+    weekly_files = catalog.select(cohort_files, weekly=True)
+
+    lookup = None
+    params = [
+        breakdowns,
+        FILTERS,
+        counts_cache.source_digest(
+            cohorts,
+            dtypes,
+            get_summary_stats,
+            event_rows,
+            count_events,
+            calculate_file_results,
+            merge_counts,
+            calculate_all_counts,
+            encode_groups,
+        ),
+    ]
+    if ethnicity_file is not None:
+        lookup = read_lookup(ethnicity_file, breakdowns)
+        params.append(counts_cache.file_signature(ethnicity_file))
+
+    patients = DistinctCounter()
+    patients_with_events = DistinctCounter()
+    practices = DistinctCounter()
+    practice_with_events = DistinctCounter()
+    events = {}
+    file_counts = {}
+    # Each monthly file is read once. Its event counts are added to the counters as
+    # soon as it is counted, so that only its measure counts are kept.
+    for file, (batch_stats, counts) in counts_cache.iter_cached(
+        list(monthly_files),
+        functools.partial(
+            iter_file_results,
+            breakdowns=breakdowns,
+            workers=workers,
+            memory_budget=memory_budget,
+            lookup=lookup,
+        ),
+        cache_dir,
+        params,
+    ):
+        events[monthly_files[file]] = sum(stats["num_events"] for stats in batch_stats)
+        for stats in batch_stats:
+            patients.update(stats["unique_patients"])
+            patients_with_events.update(stats["patients_with_events"])
+            practices.update(stats["unique_practices"])
+            practice_with_events.update(stats["unique_practices_with_events"])
+        file_counts[file] = counts
+
+    measure_df = concat_counts(file_counts[file] for file in monthly_files)
+    frames = write_measure_outputs(measure_df, output_dir)
+
+    save_to_json(
+        summarise_event_counts(
+            events,
+            count_weekly_events(weekly_files),
+            patients,
+            patients_with_events,
+            practices,
+            practice_with_events,
+        ),
+        f"{output_dir}/event_counts.json",
+    )
+    return frames
+
+
+def main():
+    args = parse_args()
+    measures_and_counts(
+        args.input_dir,
+        args.output_dir,
+        args.breakdowns,
+        args.ethnicity_file,
+        workers=args.workers,
+        memory_budget=args.memory_budget and args.memory_budget * 1024 * 1024,
+        cache_dir=args.cache_dir,
+    )
+
+
+if __name__ == "__main__":
+    main()
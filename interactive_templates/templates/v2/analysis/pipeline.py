@@ -0,0 +1,161 @@
+import argparse
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from analysis.measure_store import select_measures
+from analysis.measures_and_counts import measures_and_counts
+from analysis.plot_measures import RENDERERS, plot_figures, plotted_groups
+from analysis.render_report import config_kwargs, render
+from analysis.top_5 import write_top_5_tables
+
+
+@contextmanager
+def stage(name):
+    """Reports how long a stage of the pipeline takes."""
+    start = time.perf_counter()
+    yield
+    print(f"{name}: {time.perf_counter() - start:.1f}s")
+
+
+def run_pipeline(
+    input_dir,
+    output_dir,
+    breakdowns,
+    codelist_1_path,
+    codelist_2_path,
+    config,
+    ethnicity_file=None,
+    workers=1,
+    memory_budget=None,
+    cache_dir=None,
+    renderer="matplotlib",
+):
+    """
+    Run the stages after the cohort extractions, in one process.
+
+    The stages are those of the measures_and_counts, top_5, plot_measures and
+    render_report actions, and they write the same files. The measure store is written
+    once, and the later stages are handed its tables rather than reading it.
+
+    Args:
+        input_dir (Path): The directory of the cohort files, and of the joined cohort
+            files.
+        output_dir (Path): The directory to write to.
+        breakdowns (list): The breakdowns to calculate the measures for.
+        codelist_1_path (str): Path to codelist for event 1
+        codelist_2_path (str): Path to codelist for event 2
+        config (dict): The analysis config, for the report.
+        ethnicity_file (Path, optional): See `measures_and_counts`.
+        workers (int): The number of worker processes, as for `measures_and_counts`
+            and `plot_measures.plot_figures`.
+        memory_budget (int, optional): See `measures_and_counts`.
+        cache_dir (Path, optional): See `measures_and_counts`.
+        renderer (str): See `plot_measures.plot_figures`.
+    """
+    with stage("measures_and_counts"):
+        frames = measures_and_counts(
+            input_dir,
+            output_dir,
+            breakdowns,
+            ethnicity_file,
+            workers=workers,
+            memory_budget=memory_budget,
+            cache_dir=cache_dir,
+        )
+
+    with stage("top_5"):
+        write_top_5_tables(
+            select_measures(frames, ["event_1_code", "event_2_code"]),
+            codelist_1_path,
+            codelist_2_path,
+            output_dir,
+        )
+
+    with stage("plot_measures"):
+        plot_figures(
+            select_measures(frames, plotted_groups(frames)),
+            select_measures(frames, ["practice"]),
+            breakdowns,
+            output_dir,
+            workers=workers,
+            renderer=renderer,
+        )
+
+    with stage("render_report"):
+        render(output_dir, **config_kwargs(config))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run every action after the cohort extractions, in one process"
+    )
+    parser.add_argument("--breakdowns", action="append", default=[], required=False)
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        required=True,
+        help="directory of the cohort files, and of the joined cohort files",
+    )
+    parser.add_argument("--output-dir", type=Path, required=True)
+    parser.add_argument("--codelist-1-path", help="Path to codelist for event 1")
+    parser.add_argument("--codelist-2-path", help="Path to codelist for event 2")
+    parser.add_argument(
+        "--ethnicity-file",
+        type=Path,
+        required=False,
+        help="ethnicity cohort file to join the ethnicity of each patient from, if "
+        "the cohort files don't have it",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to read and count cohort files, and to render "
+        "figures, in",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        required=False,
+        help="memory, in MB, to read cohort files in; larger files are read in batches",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        required=False,
+        help="directory to cache the counts for each cohort file in, between runs "
+        "outside the job-runner",
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=RENDERERS,
+        default="matplotlib",
+        help="draw the figures as PNGs with matplotlib, or as SVGs",
+    )
+    return parser.parse_args()
+
+
+def main():
+    # config.json is read when the config module is imported, so it's imported here
+    # rather than when this module is imported
+    from analysis.config import CONFIG
+
+    args = parse_args()
+    run_pipeline(
+        args.input_dir,
+        args.output_dir,
+        args.breakdowns,
+        args.codelist_1_path,
+        args.codelist_2_path,
+        CONFIG,
+        args.ethnicity_file,
+        workers=args.workers,
+        memory_budget=args.memory_budget and args.memory_budget * 1024 * 1024,
+        cache_dir=args.cache_dir,
+        renderer=args.renderer,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,302 @@
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-import pandas as pd
-import seaborn as sns
-from report_utils import deciles_chart, plot_measures
+from analysis import figure_manifest, svg_charts
+from analysis.measure_store import list_groups, read_measures, to_measure_table
+from analysis.report_charts import decile_chart, measure_chart
+from analysis.report_utils import CATEGORY_ORDERS
 
 
-def parse_args():
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--breakdowns", action="append", default=[], help="breakdowns to use"
-    )
-    parser.add_argument("--input-dir", help="input directory", type=Path, required=True)
-    parser.add_argument(
-        "--output-dir", help="output directory", type=Path, required=True
-    )
-    args = parser.parse_args()
-    return args
+# The hashes of the data and styling that each figure was rendered with
+MANIFEST_NAME = "plot_measures_manifest.json"
 
+# The renderers that figures can be drawn with. matplotlib draws PNGs; svg draws SVGs
+# of the same charts, without importing matplotlib.
+RENDERERS = ["matplotlib", "svg"]
 
-def main():
-    args = parse_args()
 
-    sns.set_style("darkgrid")
+def figure_jobs(df, practice_df, breakdowns, output_dir, renderer="matplotlib"):
+    """
+    Lists the figures to render, as independent jobs.
 
-    df = pd.read_csv(args.input_dir / "measure_all.csv", parse_dates=["date"])
+    Each job is a (path, function, kwargs) tuple, where the function draws one figure
+    and saves it to the path. The filename of each figure depends only on the
+    breakdown, so the outputs are the same however the jobs are run.
 
-    # subset of the measures file that is used for plotting in this script
-    df = df.loc[~(df["group"].isin(["event_1_code", "event_2_code", "practice"])), :]
+    Args:
+        df (pd.DataFrame): The unredacted rows of the measures to plot.
+        practice_df (pd.DataFrame): The measures grouped by practice, for the deciles
+                                    chart.
+        breakdowns (list): The names of the breakdowns to plot.
+        output_dir (Path): The directory to save the figures in.
+        renderer (str): One of `RENDERERS`. Defaults to matplotlib.
 
-    Path(args.output_dir / "for_checking").mkdir(parents=True, exist_ok=True)
-    df.to_csv(
-        args.output_dir / "for_checking" / "plot_measure_for_checking.csv", index=False
-    )
+    Returns:
+        list: A (path, function, kwargs) tuple for each figure.
+    """
+    if renderer == "svg":
+        return svg_figure_jobs(df, practice_df, breakdowns, output_dir)
 
-    df = df.loc[df["value"] != "[Redacted]", :]
-    df["value"] = df["value"].astype(float)
+    # matplotlib is slow to import, so it's only imported when it draws the figures
+    from analysis.report_plots import deciles_chart, plot_measures
 
-    df_total = df.loc[df["group"] == "total", :]
+    jobs = []
 
+    df_total = df.loc[df["group"] == "total", :]
     if not df_total.empty:
-        plot_measures(
-            df_total,
-            filename=args.output_dir / "plot_measures",
-            column_to_plot="value",
-            y_label="Rate per 1000",
-            category=None,
+        jobs.append(
+            (
+                output_dir / "plot_measures.png",
+                plot_measures,
+                dict(
+                    df=df_total,
+                    filename=output_dir / "plot_measures",
+                    column_to_plot="value",
+                    y_label="Rate per 1000",
+                    category=None,
+                ),
+            )
         )
 
-    for breakdown in args.breakdowns:
-        df_subset = df.loc[df["group"] == breakdown, :]
-
-        if breakdown == "imd":
-            plot_measures(
-                df_subset,
-                filename=args.output_dir / f"plot_measures_{breakdown}",
-                column_to_plot="value",
-                y_label="Rate per 1000",
-                category="group_value",
-                category_order=[
-                    "Most deprived",
-                    "2",
-                    "3",
-                    "4",
-                    "Least deprived",
-                ],
+    for breakdown in breakdowns:
+        jobs.append(
+            (
+                output_dir / f"plot_measures_{breakdown}.png",
+                plot_measures,
+                dict(
+                    df=df.loc[df["group"] == breakdown, :],
+                    filename=output_dir / f"plot_measures_{breakdown}",
+                    column_to_plot="value",
+                    y_label="Rate per 1000",
+                    category="group_value",
+                    category_order=CATEGORY_ORDERS.get(breakdown),
+                ),
             )
+        )
 
-        elif breakdown == "age":
-            plot_measures(
-                df_subset,
-                filename=args.output_dir / f"plot_measures_{breakdown}",
-                column_to_plot="value",
-                y_label="Rate per 1000",
-                category="group_value",
-                category_order=[
-                    "0-5",
-                    "6-10",
-                    "11-17",
-                    "0-17",
-                    "18-29",
-                    "30-39",
-                    "40-49",
-                    "50-59",
-                    "60-69",
-                    "70-79",
-                    "80+",
-                ],
-            )
+    jobs.append(
+        (
+            output_dir / "deciles_chart.png",
+            deciles_chart,
+            dict(
+                df=practice_df,
+                filename=output_dir / "deciles_chart.png",
+                period_column="date",
+                column="value",
+                ylabel="rate per 1000",
+            ),
+        )
+    )
+    return jobs
+
+
+def svg_figure_jobs(df, practice_df, breakdowns, output_dir):
+    """
+    Lists the figures to render as SVGs, as independent jobs.
+
+    The figures have the same names as those listed by `figure_jobs`, with an .svg
+    extension. The data for each chart is laid out here, so the jobs only draw it.
+
+    Args:
+        See `figure_jobs`.
+
+    Returns:
+        list: A (path, function, kwargs) tuple for each figure.
+    """
+    charts = {}
+    df_total = df.loc[df["group"] == "total", :]
+    if not df_total.empty:
+        charts["plot_measures"] = measure_chart(df_total)
+    for breakdown in breakdowns:
+        charts[f"plot_measures_{breakdown}"] = measure_chart(
+            df.loc[df["group"] == breakdown, :],
+            "group_value",
+            CATEGORY_ORDERS.get(breakdown),
+        )
+    charts["deciles_chart"] = decile_chart(practice_df)
+
+    return [
+        (
+            output_dir / f"{name}.svg",
+            svg_charts.write_chart,
+            dict(chart=chart, filename=output_dir / f"{name}.svg"),
+        )
+        for name, chart in charts.items()
+    ]
+
+
+def init_renderer(renderer="matplotlib"):
+    """Sets up matplotlib to render figures to files, without a display."""
+    if renderer != "matplotlib":
+        return
+
+    import matplotlib
+    import seaborn as sns
+
+    matplotlib.use("Agg")
+    sns.set_style("darkgrid")
+
+
+def render(job):
+    _, function, kwargs = job
+    function(**kwargs)
 
-        else:
-            plot_measures(
-                df_subset,
-                filename=args.output_dir / f"plot_measures_{breakdown}",
-                column_to_plot="value",
-                y_label="Rate per 1000",
-                category="group_value",
-            )
 
-    practice_df = pd.read_csv(
-        args.output_dir / "measure_practice_rate_deciles.csv",
-        parse_dates=["date"],
+def render_figures(jobs, workers=1, renderer="matplotlib"):
+    """
+    Renders figures, in a pool of worker processes.
+
+    Args:
+        jobs (list): The (path, function, kwargs) tuples returned by `figure_jobs`.
+        workers (int): The number of worker processes, at most one for each job.
+                       Defaults to 1, which renders the figures in this process, one
+                       after another.
+        renderer (str): The renderer that the jobs were listed for. Defaults to
+                        matplotlib.
+    """
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_renderer, initargs=(renderer,)
+        ) as executor:
+            # consume the results, so that an error in a job is raised here
+            list(executor.map(render, jobs))
+    else:
+        init_renderer(renderer)
+        for job in jobs:
+            render(job)
+
+
+def render_changed_figures(jobs, manifest_path, workers=1, renderer="matplotlib"):
+    """
+    Renders the figures whose data or styling has changed since they were rendered.
+
+    The hash of each figure's data and styling is kept in a manifest. A figure is
+    rendered again only if it doesn't exist, or if its hash doesn't match the one in
+    the manifest.
+
+    Args:
+        jobs (list): See `render_figures`.
+        manifest_path (Path): The path to the manifest.
+        workers (int): See `render_figures`.
+        renderer (str): See `render_figures`.
+
+    Returns:
+        list: The paths to the figures that were rendered.
+    """
+    manifest = figure_manifest.load(manifest_path)
+    hashes = {
+        path.name: figure_manifest.figure_hash(function, kwargs)
+        for path, function, kwargs in jobs
+    }
+    changed = [
+        job
+        for job in jobs
+        if not figure_manifest.is_current(job[0], manifest, hashes[job[0].name])
+    ]
+    render_figures(changed, workers, renderer)
+    figure_manifest.save(manifest_path, {**manifest, **hashes})
+    return [path for path, _, _ in changed]
+
+
+def plotted_groups(groups):
+    """The subset of a measure store's groups that is plotted by `plot_figures`."""
+    return [
+        group
+        for group in groups
+        if group not in ["event_1_code", "event_2_code", "practice"]
+    ]
+
+
+def plot_figures(
+    df,
+    practice_df,
+    breakdowns,
+    output_dir,
+    workers=1,
+    skip_unchanged=False,
+    renderer="matplotlib",
+):
+    """
+    Writes the measures for checking, and renders the figures.
+
+    Args:
+        df (pd.DataFrame): The measures to plot, read from the measure store, with the
+            groups listed by `plotted_groups`.
+        practice_df (pd.DataFrame): See `figure_jobs`.
+        breakdowns (list): See `figure_jobs`.
+        output_dir (Path): See `figure_jobs`.
+        workers (int): See `render_figures`.
+        skip_unchanged (bool): Whether to render only the figures that have changed
+            since they were rendered, as `render_changed_figures` does, and write its
+            manifest. The job-runner doesn't keep an action's figures, or the
+            manifest, between runs, so this only skips figures outside it. Defaults to
+            False, which renders every figure.
+        renderer (str): See `figure_jobs`.
+    """
+    Path(output_dir / "for_checking").mkdir(parents=True, exist_ok=True)
+    to_measure_table(df).to_csv(
+        output_dir / "for_checking" / "plot_measure_for_checking.csv", index=False
     )
-    deciles_chart(
-        practice_df,
-        args.output_dir / "deciles_chart.png",
-        period_column="date",
-        column="value",
-        ylabel="rate per 1000",
+
+    df = df.loc[~df["redacted"], :]
+
+    jobs = figure_jobs(df, practice_df, breakdowns, output_dir, renderer=renderer)
+    if skip_unchanged:
+        render_changed_figures(
+            jobs, output_dir / MANIFEST_NAME, workers=workers, renderer=renderer
+        )
+    else:
+        render_figures(jobs, workers=workers, renderer=renderer)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--breakdowns", action="append", default=[], help="breakdowns to use"
+    )
+    parser.add_argument("--input-dir", help="input directory", type=Path, required=True)
+    parser.add_argument(
+        "--output-dir", help="output directory", type=Path, required=True
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes to render figures in",
+    )
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="only render the figures whose data and styling have changed since the "
+        f"last run with this option, as recorded in {MANIFEST_NAME}; outside the "
+        "job-runner only, as it doesn't keep the figures between runs",
+    )
+    parser.add_argument(
+        "--renderer",
+        choices=RENDERERS,
+        default="matplotlib",
+        help="draw the figures as PNGs with matplotlib, or as SVGs",
+    )
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+
+    store_dir = args.input_dir / "measures"
+
+    groups = plotted_groups(list_groups(store_dir))
+    plot_figures(
+        read_measures(store_dir, groups),
+        read_measures(store_dir, ["practice"]),
+        args.breakdowns,
+        args.output_dir,
+        workers=args.workers,
+        skip_unchanged=args.skip_unchanged,
+        renderer=args.renderer,
     )
 
 
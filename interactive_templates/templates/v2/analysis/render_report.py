@@ -1,11 +1,11 @@
 import argparse
 import csv
+import functools
 import json
-import mimetypes
-from base64 import b64encode
 from pathlib import Path
 
-from config import CONFIG
+from analysis.report_charts import chart_data
+from analysis.report_images import ImageEncoder
 from jinja2 import Environment, FileSystemLoader, Markup, StrictUndefined
 
 
@@ -15,18 +15,37 @@ ENVIRONMENT = Environment(
 )
 
 
-def display_image(src, data):
-    src = Path(src)
+def display_image(src, data, encoder=None):
+    if encoder is None:
+        encoder = ImageEncoder(compress=False)
+
+    return Markup(
+        f'<img src="{encoder.encode(src)}" title="Image generated from file: {data}">'
+    )
 
-    encoded = b64encode(src.read_bytes()).decode("utf8")
-    mtype, _ = mimetypes.guess_type(str(src))
 
+def display_chart(chart, data):
     return Markup(
-        f'<img src="data:{mtype};base64,{encoded}" title="Image generated from file: {data}">'
+        f'<div data-chart="{chart}" title="Chart generated from file: {data}">'
+        "<noscript>This chart needs JavaScript to be displayed.</noscript></div>"
     )
 
 
+def display_figure(figure, encoder=None, interactive=False):
+    """
+    Display a figure of the report, as an image or as an interactive chart
+    Args:
+        figure: the figure, from `get_data`
+        encoder: the ImageEncoder to embed images with, optional
+        interactive: whether to display the figure as an interactive chart
+    """
+    if interactive:
+        return display_chart(figure["chart"], figure["data"])
+    return display_image(figure["path"], figure["data"], encoder)
+
+
 ENVIRONMENT.globals["display_image"] = display_image
+ENVIRONMENT.globals["display_figure"] = display_figure
 
 
 def data_from_csv(path):
@@ -133,6 +152,11 @@ def get_data(
     }
 
     for figure in figures:
+        figures[figure]["chart"] = figure
+        # plot_measures.py draws SVGs rather than PNGs with --renderer=svg
+        svg_path = figures[figure]["path"].with_suffix(".svg")
+        if not figures[figure]["path"].exists() and svg_path.exists():
+            figures[figure]["path"] = svg_path
         if not figures[figure]["path"].exists():
             figures[figure]["exists"] = False
         else:
@@ -211,61 +235,100 @@ def get_data(
         "time_scale": time_scale,
         "time_event": time_event,
         "time_ever": time_ever,
+        "charts": None,
     }
     return report_data
 
 
-def render_report(report_path, data):
-    """
-    Render the report template with data
-    Args:
-        report_path: path to the report template
-        data: data to render
-
-    """
-    template = ENVIRONMENT.get_template("analysis/report_template.html")
-    return template.render(data)
-
-
-def write_html(html, output_dir):
-    """
-    Write the html to a file in the output directory
-    Args:
-        html: html to write
-        output_dir: directory to write to
-    """
-    with open(output_dir + "/report.html", "w") as f:
-        f.write(html)
-
-
-def render(output_dir, **kwargs):
+def render(
+    output_dir,
+    image_width=None,
+    image_colors=256,
+    compress_images=True,
+    interactive=False,
+    **kwargs,
+):
     report_data = get_data(output_dir=output_dir, **kwargs)
+    if interactive:
+        # The charts are drawn from the measures, rather than from plot_measures'
+        # figures
+        charts = chart_data(output_dir / "measures", kwargs.get("breakdowns", []))
+        for name, figure in report_data["figures"].items():
+            figure["exists"] = name in charts
+        report_data["charts"] = charts
+
+    encoder = ImageEncoder(image_width, image_colors, compress_images)
     template = ENVIRONMENT.get_template("analysis/report_template.html")
-    report = args.output_dir / "report.html"
-    report.write_text(template.render(report_data))
+    report = output_dir / "report.html"
+    report.write_text(
+        template.render(
+            report_data,
+            display_figure=functools.partial(
+                display_figure, encoder=encoder, interactive=interactive
+            ),
+        )
+    )
+    if encoder.bytes_before:
+        print(encoder.summary())
 
 
 def get_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument("--output-dir", type=Path)
+    parser.add_argument(
+        "--interactive",
+        action="store_true",
+        help="draw the charts in the browser from the measures, rather than embedding "
+        "plot_measures' figures",
+    )
+    parser.add_argument(
+        "--image-width",
+        type=int,
+        help="maximum width of the embedded charts, in pixels (default: unchanged)",
+    )
+    parser.add_argument(
+        "--image-colors",
+        type=int,
+        default=256,
+        help="number of colours to reduce the embedded charts to",
+    )
+    parser.add_argument(
+        "--no-image-compression",
+        dest="compress_images",
+        action="store_false",
+        help="embed the charts as they are",
+    )
     return parser
 
 
-if __name__ == "__main__":
+def config_kwargs(config):
+    """The arguments to `get_data` that are read from the analysis config."""
+    return dict(
+        population=config["filter_population"],
+        breakdowns=config["demographics"],
+        start_date=config["start_date"],
+        end_date=config["end_date"],
+        codelist_1_name=config["codelist_1"]["label"],
+        codelist_2_name=config["codelist_2"]["label"],
+        codelist_1_link=config["codelist_1"]["slug"],
+        codelist_2_link=config["codelist_2"]["slug"],
+        time_value=config["time_value"],
+        time_scale=config["time_scale"],
+        time_event=config["time_event"],
+        time_ever=config["time_ever"],
+    )
+
+
+def main():
+    # config.json is read when the config module is imported, so it's imported here
+    # rather than when this module is imported
+    from analysis.config import CONFIG
+
     parser = get_parser()
     args = parser.parse_args()
 
-    args.population = CONFIG["filter_population"]
-    args.breakdowns = CONFIG["demographics"]
-    args.start_date = CONFIG["start_date"]
-    args.end_date = CONFIG["end_date"]
-    args.codelist_1_name = CONFIG["codelist_1"]["label"]
-    args.codelist_2_name = CONFIG["codelist_2"]["label"]
-    args.codelist_1_link = CONFIG["codelist_1"]["slug"]
-    args.codelist_2_link = CONFIG["codelist_2"]["slug"]
-    args.time_value = CONFIG["time_value"]
-    args.time_scale = CONFIG["time_scale"]
-    args.time_event = CONFIG["time_event"]
-    args.time_ever = CONFIG["time_ever"]
-
-    render(**vars(args))
+    render(**vars(args), **config_kwargs(CONFIG))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+// Draws the report's charts from the data embedded in it, without any libraries, so
+// that the report works offline. Each element with a data-chart attribute is replaced
+// by an SVG line chart of the named chart's data. Hovering over a chart shows the
+// values at the nearest date.
+(function () {
+  "use strict";
+
+  var SVG_NS = "http://www.w3.org/2000/svg";
+  var WIDTH = 960;
+  var HEIGHT = 500;
+  var MARGIN = { top: 20, right: 20, bottom: 110, left: 80 };
+  var LEGEND_WIDTH = 240;
+  // matplotlib's default colour cycle, as in the PNG charts
+  var COLOURS = [
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+  ];
+  // The lines of the decile chart, as in report_plots.deciles_chart
+  var STYLES = {
+    percentile: { colour: "blue", width: 0.8, dash: "1,2" },
+    decile: { colour: "blue", width: 1, dash: "4,2" },
+    median: { colour: "blue", width: 1.5, dash: null },
+  };
+  var MONTHS = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+  ];
+
+  function element(name, attributes, parent) {
+    var el = document.createElementNS(SVG_NS, name);
+    Object.keys(attributes).forEach(function (key) {
+      if (attributes[key] !== null) {
+        el.setAttribute(key, attributes[key]);
+      }
+    });
+    if (parent) {
+      parent.appendChild(el);
+    }
+    return el;
+  }
+
+  function formatDate(date) {
+    var parts = date.split("-");
+    return MONTHS[Number(parts[1]) - 1] + " " + parts[0];
+  }
+
+  function niceStep(max, ticks) {
+    var rough = max / ticks;
+    var magnitude = Math.pow(10, Math.floor(Math.log10(rough)));
+    var steps = [1, 2, 2.5, 5, 10];
+    for (var i = 0; i < steps.length; i++) {
+      if (steps[i] * magnitude >= rough) {
+        return steps[i] * magnitude;
+      }
+    }
+    return 10 * magnitude;
+  }
+
+  // The points of a line, split where it has no value unless it is connected
+  function segments(values, x, y, connect) {
+    var result = [];
+    var current = [];
+    values.forEach(function (value, i) {
+      if (value === null) {
+        if (!connect && current.length) {
+          result.push(current);
+          current = [];
+        }
+        return;
+      }
+      current.push(x(i).toFixed(1) + "," + y(value).toFixed(1));
+    });
+    if (current.length) {
+      result.push(current);
+    }
+    return result;
+  }
+
+  function lineStyle(series, i) {
+    if (series.style) {
+      return STYLES[series.style];
+    }
+    return { colour: COLOURS[i % COLOURS.length], width: 1.5, dash: null };
+  }
+
+  function drawChart(container, chart) {
+    var width = WIDTH + (chart.legend ? LEGEND_WIDTH : 0);
+    var plotWidth = WIDTH - MARGIN.left - MARGIN.right;
+    var plotHeight = HEIGHT - MARGIN.top - MARGIN.bottom;
+    var svg = element("svg", {
+      viewBox: "0 0 " + width + " " + HEIGHT,
+      width: "100%",
+      role: "img",
+      "font-family": "sans-serif",
+      "font-size": 14,
+    });
+
+    var max = 0;
+    chart.series.forEach(function (series) {
+      series.values.forEach(function (value) {
+        if (value !== null && value > max) {
+          max = value;
+        }
+      });
+    });
+    max = max > 0 ? max * 1.05 : 100;
+    var step = niceStep(max, 6);
+
+    var dates = chart.dates;
+    var x = function (i) {
+      var fraction = dates.length > 1 ? i / (dates.length - 1) : 0.5;
+      return MARGIN.left + fraction * plotWidth;
+    };
+    var y = function (value) {
+      return MARGIN.top + plotHeight * (1 - value / max);
+    };
+
+    // The background, the grid and the axes' labels
+    element("rect", {
+      x: MARGIN.left, y: MARGIN.top, width: plotWidth, height: plotHeight,
+      fill: "#eaeaf2",
+    }, svg);
+    for (var tick = 0; tick <= max; tick += step) {
+      element("line", {
+        x1: MARGIN.left, x2: MARGIN.left + plotWidth, y1: y(tick), y2: y(tick),
+        stroke: "white",
+      }, svg);
+      element("text", {
+        x: MARGIN.left - 8, y: y(tick), "text-anchor": "end",
+        "dominant-baseline": "middle",
+      }, svg).textContent = +tick.toFixed(6);
+    }
+    var every = Math.max(1, Math.ceil(dates.length / 12));
+    dates.forEach(function (date, i) {
+      if (i % every) {
+        return;
+      }
+      element("line", {
+        x1: x(i), x2: x(i), y1: MARGIN.top, y2: MARGIN.top + plotHeight,
+        stroke: "white",
+      }, svg);
+      element("text", {
+        transform: "translate(" + x(i) + "," + (MARGIN.top + plotHeight + 8) +
+          ") rotate(-90)",
+        "text-anchor": "end", "dominant-baseline": "middle",
+      }, svg).textContent = formatDate(date);
+    });
+    element("text", {
+      transform: "translate(20," + (MARGIN.top + plotHeight / 2) + ") rotate(-90)",
+      "text-anchor": "middle", "font-size": 16,
+    }, svg).textContent = chart.y_label;
+
+    // The lines, and a legend entry for each legend label
+    var legend = [];
+    chart.series.forEach(function (series, i) {
+      var style = lineStyle(series, i);
+      segments(series.values, x, y, chart.connect).forEach(function (points) {
+        element("polyline", {
+          points: points.join(" "), fill: "none", stroke: style.colour,
+          "stroke-width": style.width * 1.5, "stroke-dasharray": style.dash,
+        }, svg);
+      });
+      if (legend.indexOf(series.legend) === -1) {
+        legend.push(series.legend);
+        if (chart.legend) {
+          var legendY = MARGIN.top + 20 + 24 * (legend.length - 1);
+          element("line", {
+            x1: WIDTH + 10, x2: WIDTH + 40, y1: legendY, y2: legendY,
+            stroke: style.colour, "stroke-width": style.width * 1.5,
+            "stroke-dasharray": style.dash,
+          }, svg);
+          element("text", {
+            x: WIDTH + 48, y: legendY, "dominant-baseline": "middle",
+          }, svg).textContent = series.legend;
+        }
+      }
+    });
+
+    // The values at the date nearest the pointer
+    var rule = element("line", {
+      y1: MARGIN.top, y2: MARGIN.top + plotHeight, stroke: "#555",
+      visibility: "hidden",
+    }, svg);
+    var tooltip = document.createElement("div");
+    tooltip.style.cssText =
+      "position:absolute;display:none;pointer-events:none;background:white;" +
+      "border:1px solid #999;padding:4px 8px;font:13px sans-serif;";
+    var overlay = element("rect", {
+      x: MARGIN.left, y: MARGIN.top, width: plotWidth, height: plotHeight,
+      fill: "transparent",
+    }, svg);
+    overlay.addEventListener("mousemove", function (event) {
+      var box = svg.getBoundingClientRect();
+      var pointer = (event.clientX - box.left) * (width / box.width);
+      var fraction = (pointer - MARGIN.left) / plotWidth;
+      var i = Math.round(fraction * (dates.length - 1));
+      i = Math.min(Math.max(i, 0), dates.length - 1);
+      rule.setAttribute("x1", x(i));
+      rule.setAttribute("x2", x(i));
+      rule.setAttribute("visibility", "visible");
+
+      tooltip.textContent = "";
+      var heading = document.createElement("strong");
+      heading.textContent = formatDate(dates[i]);
+      tooltip.appendChild(heading);
+      chart.series.forEach(function (series) {
+        // the outer percentiles would crowd the tooltip
+        if (series.style !== "percentile" && series.values[i] !== null) {
+          var row = document.createElement("div");
+          row.textContent = series.name + ": " + series.values[i];
+          tooltip.appendChild(row);
+        }
+      });
+      tooltip.style.display = "block";
+      tooltip.style.left = event.pageX + 12 + "px";
+      tooltip.style.top = event.pageY + 12 + "px";
+    });
+    overlay.addEventListener("mouseleave", function () {
+      rule.setAttribute("visibility", "hidden");
+      tooltip.style.display = "none";
+    });
+
+    container.appendChild(svg);
+    document.body.appendChild(tooltip);
+  }
+
+  var charts = JSON.parse(document.getElementById("chart-data").textContent);
+  document.querySelectorAll("[data-chart]").forEach(function (container) {
+    var chart = charts[container.getAttribute("data-chart")];
+    if (chart) {
+      drawChart(container, chart);
+    }
+  });
+})();
@@ -0,0 +1,140 @@
+import numpy as np
+from analysis.measure_store import list_groups, read_measures
+from analysis.report_utils import CATEGORY_ORDERS, compute_deciles, pivot_categories
+
+
+# The style and legend label of each line of the decile chart, as in
+# `report_plots.deciles_chart`
+DECILE_STYLES = {
+    "percentile": "1st-9th, 91st-99th percentile",
+    "decile": "Decile",
+    "median": "Median",
+}
+
+# The suffixes of ordinals that don't end in "th", by their last digit
+SUFFIXES = {1: "st", 2: "nd", 3: "rd"}
+
+
+def ordinal(n):
+    """Formats a number as an ordinal, such as 1st, 2nd or 11th."""
+    if n % 100 in (11, 12, 13):
+        return f"{n}th"
+    suffix = SUFFIXES.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def to_values(column, decimals=2):
+    """Converts a column of values to a list, with None for missing values."""
+    values = np.round(column.to_numpy(dtype=float), decimals)
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def measure_chart(df, category=None, category_order=None):
+    """
+    Lays out the rates of a measure as the data for an interactive chart.
+
+    Args:
+        df: The unredacted rows of a group of a measure table
+        category: Name of column indicating different categories, optional
+        category_order: List of categories in order to plot, optional
+
+    Returns:
+        A dict with the dates, and the name and values of each line. Lines are
+        connected across dates where they have no value, as in
+        `report_plots.plot_measures`.
+    """
+    if category:
+        values = pivot_categories(df, "value", category, category_order)
+    else:
+        values = df.groupby("date")[["value"]].mean().set_axis(["Total"], axis=1)
+
+    return {
+        "dates": values.index.strftime("%Y-%m-%d").tolist(),
+        "series": [
+            {"name": str(name), "legend": str(name), "values": to_values(values[name])}
+            for name in values.columns
+        ],
+        "legend": bool(category),
+        "connect": True,
+        "y_label": "Rate per 1000",
+    }
+
+
+def decile_chart(practice_df):
+    """
+    Lays out the percentiles of practices' rates as the data for an interactive chart.
+
+    Args:
+        practice_df: The measure table grouped by practice
+
+    Returns:
+        A dict with the dates, and the name, style, legend label and values of each
+        percentile's line. Lines have gaps where they have no value, as in
+        `report_plots.deciles_chart`.
+    """
+    percentiles = compute_deciles(practice_df, "date", "value").pivot(
+        index="percentile", columns="date", values="value"
+    )
+
+    series = []
+    for percentile, values in percentiles.iterrows():
+        if percentile == 50:
+            style = "median"
+        elif percentile < 10 or percentile > 90:
+            style = "percentile"
+        else:
+            style = "decile"
+        series.append(
+            {
+                "name": f"{ordinal(int(percentile))} percentile",
+                "style": style,
+                "legend": DECILE_STYLES[style],
+                "values": to_values(values),
+            }
+        )
+
+    return {
+        "dates": percentiles.columns.strftime("%Y-%m-%d").tolist(),
+        "series": series,
+        "legend": True,
+        "connect": False,
+        "y_label": "Rate per 1000",
+    }
+
+
+def chart_data(store_dir, breakdowns):
+    """
+    Lays out the measures in a measure store as the data for the report's charts.
+
+    The charts show the same measures as the figures from plot_measures.py: the
+    population rate, the rate of each breakdown, and the decile chart. Redacted rates
+    aren't shown.
+
+    Args:
+        store_dir (Path): The measure store.
+        breakdowns (list): The names of the breakdowns to chart.
+
+    Returns:
+        dict: A dict where keys are the names of the charts, as in
+            `render_report.get_data`, and values are their data. Charts without data
+            are left out.
+    """
+    groups = list_groups(store_dir)
+    df = read_measures(
+        store_dir, [group for group in ["total", *breakdowns] if group in groups]
+    )
+    df = df.loc[~df["redacted"], :]
+
+    charts = {}
+    total_df = df.loc[df["group"] == "total", :]
+    if not total_df.empty:
+        charts["population"] = measure_chart(total_df)
+    for breakdown in breakdowns:
+        breakdown_df = df.loc[df["group"] == breakdown, :]
+        if not breakdown_df.empty:
+            charts[breakdown] = measure_chart(
+                breakdown_df, "group_value", CATEGORY_ORDERS.get(breakdown)
+            )
+    if "practice" in groups:
+        charts["decile"] = decile_chart(read_measures(store_dir, ["practice"]))
+    return charts
@@ -0,0 +1,149 @@
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+from analysis.report_utils import compute_deciles, pivot_categories
+from matplotlib.collections import LineCollection
+
+
+def plot_measures(
+    df,
+    filename: str,
+    column_to_plot: str,
+    y_label: str,
+    category: str = None,
+    category_order: list = None,
+):
+    """Produce time series plot from measures table. If category is provided, one line is plotted for each sub
+    category within the category column. Saves output in 'output' dir as png file.
+    Args:
+        df: A measure table
+        column_to_plot: Column name for y-axis values
+        y_label: Label to use for y-axis
+        category: Name of column indicating different categories, optional
+        category_order: List of categories in order to plot, optional
+    """
+    _, ax = plt.subplots(figsize=(15, 8))
+
+    if category:
+        # Draw every category's line in a single call. Each line takes the next colour
+        # in the axes' cycle, as `sns.lineplot` does.
+        values = pivot_categories(df, column_to_plot, category, category_order)
+        lines_data = []
+        for unique_category in values.columns:
+            line = values[unique_category].dropna()
+            lines_data.extend([line.index, line.to_numpy()])
+        lines = ax.plot(*lines_data, markeredgewidth=0.75, markeredgecolor="w")
+        for line, unique_category in zip(lines, values.columns):
+            line.set_label(unique_category)
+
+    else:
+        ax.plot(df["date"], df[column_to_plot])
+
+    ax.set(
+        ylabel=y_label,
+        xlabel="Date",
+        ylim=(
+            0,
+            (
+                1000
+                if df[column_to_plot].isnull().values.all()
+                else df[column_to_plot].max()
+            ),
+        ),
+    )
+
+    month_locator = mdates.MonthLocator()
+    ax.xaxis.set_major_locator(month_locator)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%B %Y"))
+    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
+    plt.xticks(rotation="vertical")
+
+    if category:
+        ax.legend(
+            bbox_to_anchor=(1.04, 1),
+            loc="upper left",
+            fontsize=20,
+        )
+
+    ax.margins(x=0)
+    ax.yaxis.label.set_size(25)
+    ax.xaxis.label.set_size(25)
+    ax.tick_params(axis="both", which="major", labelsize=20)
+    plt.tight_layout()
+    plt.savefig(f"{filename}.png")
+    plt.close()
+
+
+def deciles_chart(df, filename, period_column=None, column=None, title="", ylabel=""):
+    """
+    Create a deciles chart from a dataframe and save it to a file.
+
+    Args:
+        df: the dataframe to plot
+        filename: the name of the file to save the chart to
+        period_column: the name of the column containing the date or datetime values
+        column: the name of the column to plot the deciles of
+        title: the title of the chart
+        ylabel: the label of the y-axis of the chart
+    """
+
+    fig, ax = plt.subplots(figsize=(15, 8))
+
+    linestyles = {
+        "percentile": {
+            "linestyle": ":",
+            "linewidth": 0.8,
+            "label": "1st-9th, 91st-99th percentile",
+        },
+        "decile": {"linestyle": "--", "linewidth": 1, "label": "Decile"},
+        "median": {
+            "linestyle": "-",
+            "linewidth": 1.5,
+            "label": "Median",
+            # as for a solid line drawn with `ax.plot`
+            "capstyle": "projecting",
+        },
+    }
+
+    df = compute_deciles(
+        measure_table=df,
+        groupby_col=period_column,
+        value_col=column,
+        has_outer_percentiles=True,
+    )
+
+    # A row for each percentile, and a column for each period
+    lines = df.pivot(index="percentile", columns=period_column, values=column)
+    x = mdates.date2num(lines.columns)
+    percentile = lines.index
+    styled = {
+        "percentile": (percentile < 10) | (percentile > 90),
+        "decile": (percentile >= 10) & (percentile <= 90) & (percentile != 50),
+        "median": percentile == 50,
+    }
+    for style_name, style in linestyles.items():
+        # Missing values leave gaps in the lines
+        segments = [np.column_stack([x, y]) for y in lines[styled[style_name]].values]
+        ax.add_collection(LineCollection(segments, colors="b", **style))
+
+    ax.set_ylabel(ylabel, size=20, alpha=1)
+    ax.set_title(title, size=14, wrap=True)
+    ax.set_ylim(
+        [0, 100 if df[column].isnull().values.all() else df[column].max() * 1.05]
+    )
+    ax.tick_params(labelsize=20)
+    ax.set_xlim([df[period_column].min(), df[period_column].max()])
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=90)
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%B %Y"))
+    plt.xticks(sorted(df[period_column].unique()), rotation=90)
+    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
+    ax.legend(
+        bbox_to_anchor=(1.1, 0.8),
+        loc="center left",
+        ncol=1,
+        fontsize=20,
+        borderaxespad=0.0,
+    )
+    plt.tight_layout()
+    plt.savefig(filename)
+    plt.clf()
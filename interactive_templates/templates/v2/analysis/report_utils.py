@@ -1,12 +1,10 @@
+import importlib
 import json
 import re
 from pathlib import Path
 
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import seaborn as sns
 
 
 BASE_DIR = Path(__file__).parents[1]
@@ -14,6 +12,31 @@ OUTPUT_DIR = BASE_DIR / "output"
 ANALYSIS_DIR = BASE_DIR / "analysis"
 CODELIST_DIR = BASE_DIR / "codelists"
 
+# The order of the lines in the charts of breakdowns that have a natural order. The
+# lines of other breakdowns are in the order that their groups appear.
+CATEGORY_ORDERS = {
+    "imd": [
+        "Most deprived",
+        "2",
+        "3",
+        "4",
+        "Least deprived",
+    ],
+    "age": [
+        "0-5",
+        "6-10",
+        "11-17",
+        "0-17",
+        "18-29",
+        "30-39",
+        "40-49",
+        "50-59",
+        "60-69",
+        "70-79",
+        "80+",
+    ],
+}
+
 
 def calculate_rate(df, value_col, population_col, rate_per=1000, round_rate=False):
     """Calculates the number of events per 1,000 or passed rate_per variable of the population.
@@ -86,94 +109,6 @@ def get_date_input_file(file: str, weekly=False) -> str:
         return date.group(1)
 
 
-def plot_measures(
-    df,
-    filename: str,
-    column_to_plot: str,
-    y_label: str,
-    category: str = None,
-    category_order: list = None,
-):
-    """Produce time series plot from measures table. If category is provided, one line is plotted for each sub
-    category within the category column. Saves output in 'output' dir as png file.
-    Args:
-        df: A measure table
-        column_to_plot: Column name for y-axis values
-        y_label: Label to use for y-axis
-        category: Name of column indicating different categories, optional
-        category_order: List of categories in order to plot, optional
-    """
-    if category:
-        df[category] = df[category].fillna("Missing")
-
-    _, ax = plt.subplots(figsize=(15, 8))
-    palette = sns.color_palette("tab10")
-
-    if category:
-        if category_order:
-            for unique_category in category_order:
-                df_subset = df[df[category] == unique_category].sort_values("date")
-
-                sns.lineplot(
-                    x="date",
-                    y=column_to_plot,
-                    data=df_subset,
-                    palette=palette,
-                    ax=ax,
-                    label=unique_category,
-                )
-
-        else:
-            for unique_category in df[category].unique():
-                df_subset = df[df[category] == unique_category].sort_values("date")
-
-                sns.lineplot(
-                    x="date",
-                    y=column_to_plot,
-                    data=df_subset,
-                    palette=palette,
-                    ax=ax,
-                    label=unique_category,
-                )
-
-    else:
-        ax.plot(df["date"], df[column_to_plot])
-
-    ax.set(
-        ylabel=y_label,
-        xlabel="Date",
-        ylim=(
-            0,
-            (
-                1000
-                if df[column_to_plot].isnull().values.all()
-                else df[column_to_plot].max()
-            ),
-        ),
-    )
-
-    month_locator = mdates.MonthLocator()
-    ax.xaxis.set_major_locator(month_locator)
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%B %Y"))
-    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
-    plt.xticks(rotation="vertical")
-
-    if category:
-        ax.legend(
-            bbox_to_anchor=(1.04, 1),
-            loc="upper left",
-            fontsize=20,
-        )
-
-    ax.margins(x=0)
-    ax.yaxis.label.set_size(25)
-    ax.xaxis.label.set_size(25)
-    ax.tick_params(axis="both", which="major", labelsize=20)
-    plt.tight_layout()
-    plt.savefig(f"{filename}.png")
-    plt.close()
-
-
 def calculate_variable_windows_codelist_1(
     codelist_1_frequency,
 ):
@@ -222,10 +157,38 @@ def calculate_variable_windows_codelist_2(
     return codelist_2_date_range
 
 
+def pivot_categories(df, column, category, category_order=None):
+    """
+    Pivots a measure table into a matrix of the values of a column, by date and category.
+
+    Args:
+        df: A measure table
+        column: Column name for the values
+        category: Name of column indicating different categories. Missing categories
+            are labelled "Missing".
+        category_order: List of categories in order, optional. Defaults to the order
+            that the categories appear in.
+
+    Returns:
+        A dataframe indexed by date, with a column for each category in the measure
+        table, in order.
+    """
+    categories = df[category].fillna("Missing")
+    values = df[column].groupby([df["date"], categories]).mean().unstack()
+    if not category_order:
+        category_order = categories.unique()
+    return values[[c for c in category_order if c in values.columns]]
+
+
 def compute_deciles(measure_table, groupby_col, value_col, has_outer_percentiles=True):
     """
     Computes deciles and other percentiles from a measure table.
 
+    The values are laid out as a matrix, with a row for each group, sorted, and every
+    percentile of every group is computed at once. The percentiles are interpolated
+    linearly between the values on either side, ignoring missing values, as by
+    `groupby(groupby_col)[value_col].quantile`.
+
     Args:
         measure_table: the measure table to compute the percentiles from
         groupby_col: the name of the column to group by
@@ -241,101 +204,41 @@ def compute_deciles(measure_table, groupby_col, value_col, has_outer_percentiles
             [quantiles, np.arange(0.01, 0.1, 0.01), np.arange(0.91, 1, 0.01)]
         )
 
-    percentiles = (
-        measure_table.groupby(groupby_col)[value_col]
-        .quantile(pd.Series(quantiles))
-        .reset_index()
+    codes, groups = pd.factorize(measure_table[groupby_col], sort=True)
+    values = measure_table[value_col].to_numpy(dtype=float, na_value=np.nan)
+    has_group = codes != -1
+    codes, values = codes[has_group], values[has_group]
+
+    # A row of the matrix for each group, padded with missing values, and sorted with
+    # missing values last
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], values[order]
+    sizes = np.bincount(codes, minlength=len(groups))
+    starts = np.cumsum(sizes) - sizes
+    matrix = np.full((len(groups), max(sizes.max(initial=0), 1)), np.nan)
+    matrix[codes, np.arange(len(codes)) - starts[codes]] = values
+    matrix.sort(axis=1)
+
+    # The position of each percentile in each row, between two values
+    num_values = np.bincount(codes, weights=~np.isnan(values), minlength=len(groups))
+    position = quantiles * (num_values[:, np.newaxis] - 1)
+    lower = position.astype(np.int64).clip(0)
+    frac = position % 1
+    lower_value = np.take_along_axis(matrix, lower, axis=1)
+    upper = np.minimum(lower + 1, matrix.shape[1] - 1)
+    upper_value = np.take_along_axis(matrix, upper, axis=1)
+    with np.errstate(invalid="ignore"):
+        interpolated = lower_value + (upper_value - lower_value) * frac
+    percentile_values = np.where(frac == 0, lower_value, interpolated)
+    percentile_values[num_values == 0] = np.nan
+
+    return pd.DataFrame(
+        {
+            groupby_col: groups.repeat(len(quantiles)),
+            "value": percentile_values.ravel(),
+            "percentile": np.tile(np.round(quantiles * 100), len(groups)),
+        }
     )
-    percentiles["percentile"] = round(percentiles["level_1"] * 100)
-    percentiles = percentiles.rename(columns={value_col: "value"})
-
-    return percentiles[[groupby_col, "value", "percentile"]]
-
-
-def deciles_chart(df, filename, period_column=None, column=None, title="", ylabel=""):
-    """
-    Create a deciles chart from a dataframe and save it to a file.
-
-    Args:
-        df: the dataframe to plot
-        filename: the name of the file to save the chart to
-        period_column: the name of the column containing the date or datetime values
-        column: the name of the column to plot the deciles of
-        title: the title of the chart
-        ylabel: the label of the y-axis of the chart
-    """
-
-    fig, ax = plt.subplots(figsize=(15, 8))
-
-    linestyles = {
-        "decile": {"line": "b--", "linewidth": 1, "label": "Decile"},
-        "median": {"line": "b-", "linewidth": 1.5, "label": "Median"},
-        "percentile": {
-            "line": "b:",
-            "linewidth": 0.8,
-            "label": "1st-9th, 91st-99th percentile",
-        },
-    }
-
-    df = compute_deciles(
-        measure_table=df,
-        groupby_col=period_column,
-        value_col=column,
-        has_outer_percentiles=True,
-    )
-
-    label_seen = []
-    for percentile in range(1, 100):
-        data = df[df["percentile"] == percentile]
-        add_label = False
-
-        if percentile == 50:
-            style = linestyles["median"]
-            add_label = True
-        elif percentile < 10 or percentile > 90:
-            style = linestyles["percentile"]
-            if "percentile" not in label_seen:
-                label_seen.append("percentile")
-                add_label = True
-        else:
-            style = linestyles["decile"]
-            if "decile" not in label_seen:
-                label_seen.append("decile")
-                add_label = True
-        if add_label:
-            label = style["label"]
-        else:
-            label = "_nolegend_"
-
-        ax.plot(
-            data[period_column],
-            data[column],
-            style["line"],
-            linewidth=style["linewidth"],
-            label=label,
-        )
-
-    ax.set_ylabel(ylabel, size=20, alpha=1)
-    ax.set_title(title, size=14, wrap=True)
-    ax.set_ylim(
-        [0, 100 if df[column].isnull().values.all() else df[column].max() * 1.05]
-    )
-    ax.tick_params(labelsize=20)
-    ax.set_xlim([df[period_column].min(), df[period_column].max()])
-    plt.setp(ax.xaxis.get_majorticklabels(), rotation=90)
-    ax.xaxis.set_major_formatter(mdates.DateFormatter("%B %Y"))
-    plt.xticks(sorted(df[period_column].unique()), rotation=90)
-    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=2))
-    ax.legend(
-        bbox_to_anchor=(1.1, 0.8),
-        loc="center left",
-        ncol=1,
-        fontsize=20,
-        borderaxespad=0.0,
-    )
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.clf()
 
 
 def drop_zero_practices(df, measure_count_column):
@@ -353,3 +256,19 @@ def drop_zero_practices(df, measure_count_column):
 
     non_zero = df.groupby("practice")[measure_count_column].any()
     return df[df["practice"].isin(non_zero[non_zero].index)]
+
+
+# The plotting functions are in report_plots, which imports matplotlib. They're imported
+# from there when they're first used, so that scripts that don't plot don't import it.
+PLOTTING_FUNCTIONS = ["deciles_chart", "plot_measures"]
+
+
+def __getattr__(name):
+    if name not in PLOTTING_FUNCTIONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # report_utils is imported both as analysis.report_utils and as report_utils
+    if __package__:
+        report_plots = importlib.import_module(".report_plots", __package__)
+    else:
+        report_plots = importlib.import_module("report_plots")
+    return getattr(report_plots, name)
@@ -0,0 +1,233 @@
+import math
+from datetime import date
+from xml.sax.saxutils import escape, quoteattr
+
+
+WIDTH = 1000
+HEIGHT = 560
+MARGIN = {"top": 20, "right": 20, "bottom": 150, "left": 90}
+LEGEND_WIDTH = 300
+
+# matplotlib's default colour cycle, as in `report_plots.plot_measures`
+COLOURS = [
+    "#1f77b4",
+    "#ff7f0e",
+    "#2ca02c",
+    "#d62728",
+    "#9467bd",
+    "#8c564b",
+    "#e377c2",
+    "#7f7f7f",
+    "#bcbd22",
+    "#17becf",
+]
+
+# The lines of the decile chart, as in `report_plots.deciles_chart`
+STYLES = {
+    "percentile": {"colour": "blue", "width": 0.8, "dash": "1,2"},
+    "decile": {"colour": "blue", "width": 1, "dash": "4,2"},
+    "median": {"colour": "blue", "width": 1.5, "dash": None},
+}
+
+
+def element(name, text=None, **attributes):
+    """Formats an SVG element. Underscores in attribute names become hyphens."""
+    formatted = "".join(
+        f" {key.replace('_', '-')}={quoteattr(str(value))}"
+        for key, value in attributes.items()
+        if value is not None
+    )
+    if text is None:
+        return f"<{name}{formatted}/>"
+    return f"<{name}{formatted}>{escape(str(text))}</{name}>"
+
+
+def nice_step(maximum, ticks):
+    """Chooses a step between ticks of 1, 2, 2.5 or 5 times a power of ten."""
+    rough = maximum / ticks
+    magnitude = 10 ** math.floor(math.log10(rough))
+    for step in [1, 2, 2.5, 5, 10]:
+        if step * magnitude >= rough:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def format_number(value):
+    return f"{value:,.6g}"
+
+
+def line_style(series, i):
+    if series.get("style"):
+        return STYLES[series["style"]]
+    return {"colour": COLOURS[i % len(COLOURS)], "width": 1.5, "dash": None}
+
+
+def segments(values, x, y, connect):
+    """The points of a line, split where it has no value unless it is connected."""
+    points = []
+    for i, value in enumerate(values):
+        if value is None:
+            if not connect and points:
+                yield points
+                points = []
+            continue
+        points.append(f"{x(i):.1f},{y(value):.1f}")
+    if points:
+        yield points
+
+
+def render_chart(chart):
+    """
+    Renders a chart to SVG.
+
+    The chart is drawn as `report_plots` draws it, with a white grid on a grey
+    background, a tick every other month and the legend to the right, but as text
+    rather than pixels. It's the same chart as `report_charts.js` draws in the
+    browser, without the tooltip.
+
+    Args:
+        chart (dict): The chart's data, from `report_charts.measure_chart` or
+            `report_charts.decile_chart`.
+
+    Returns:
+        str: The SVG document.
+    """
+    width = WIDTH + (LEGEND_WIDTH if chart["legend"] else 0)
+    plot_width = WIDTH - MARGIN["left"] - MARGIN["right"]
+    plot_height = HEIGHT - MARGIN["top"] - MARGIN["bottom"]
+    bottom = MARGIN["top"] + plot_height
+
+    values = [v for s in chart["series"] for v in s["values"] if v is not None]
+    maximum = max(values) * 1.05 if values and max(values) > 0 else 100
+    step = nice_step(maximum, 6)
+
+    days = [date.fromisoformat(d).toordinal() for d in chart["dates"]]
+    first, span = (days[0], days[-1] - days[0]) if days else (0, 0)
+
+    def x(i):
+        fraction = (days[i] - first) / span if span else 0.5
+        return MARGIN["left"] + fraction * plot_width
+
+    def y(value):
+        return MARGIN["top"] + plot_height * (1 - value / maximum)
+
+    parts = [
+        element(
+            "rect",
+            x=MARGIN["left"],
+            y=MARGIN["top"],
+            width=plot_width,
+            height=plot_height,
+            fill="#eaeaf2",
+        )
+    ]
+
+    # The grid and the axes' labels, with a tick for every other month
+    tick = 0
+    while tick <= maximum:
+        parts.append(
+            element(
+                "line",
+                x1=MARGIN["left"],
+                x2=MARGIN["left"] + plot_width,
+                y1=f"{y(tick):.1f}",
+                y2=f"{y(tick):.1f}",
+                stroke="white",
+            )
+        )
+        parts.append(
+            element(
+                "text",
+                format_number(tick),
+                x=MARGIN["left"] - 8,
+                y=f"{y(tick):.1f}",
+                text_anchor="end",
+                dominant_baseline="middle",
+            )
+        )
+        tick += step
+    for i, d in enumerate(chart["dates"]):
+        if i % 2:
+            continue
+        parts.append(
+            element(
+                "line",
+                x1=f"{x(i):.1f}",
+                x2=f"{x(i):.1f}",
+                y1=MARGIN["top"],
+                y2=bottom,
+                stroke="white",
+            )
+        )
+        parts.append(
+            element(
+                "text",
+                date.fromisoformat(d).strftime("%B %Y"),
+                transform=f"translate({x(i):.1f},{bottom + 8}) rotate(-90)",
+                text_anchor="end",
+                dominant_baseline="middle",
+            )
+        )
+    parts.append(
+        element(
+            "text",
+            chart["y_label"],
+            transform=f"translate(24,{MARGIN['top'] + plot_height / 2}) rotate(-90)",
+            text_anchor="middle",
+            font_size=20,
+        )
+    )
+
+    # The lines, and a legend entry for each legend label
+    legend = []
+    for i, series in enumerate(chart["series"]):
+        style = line_style(series, i)
+        stroke = {
+            "fill": "none",
+            "stroke": style["colour"],
+            "stroke_width": style["width"] * 1.5,
+            "stroke_dasharray": style["dash"],
+        }
+        for points in segments(series["values"], x, y, chart["connect"]):
+            parts.append(element("polyline", points=" ".join(points), **stroke))
+        if series["legend"] in legend:
+            continue
+        legend.append(series["legend"])
+        if chart["legend"]:
+            legend_y = MARGIN["top"] + 20 + 28 * (len(legend) - 1)
+            parts.append(
+                element(
+                    "line",
+                    x1=WIDTH + 10,
+                    x2=WIDTH + 40,
+                    y1=legend_y,
+                    y2=legend_y,
+                    **{k: v for k, v in stroke.items() if k != "fill"},
+                )
+            )
+            parts.append(
+                element(
+                    "text",
+                    series["legend"],
+                    x=WIDTH + 48,
+                    y=legend_y,
+                    dominant_baseline="middle",
+                )
+            )
+
+    return "\n".join(
+        [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {HEIGHT}" '
+            f'width="{width}" height="{HEIGHT}" font-family="sans-serif" '
+            'font-size="16">',
+            *parts,
+            "</svg>",
+            "",
+        ]
+    )
+
+
+def write_chart(chart, filename):
+    """Renders a chart to an SVG file."""
+    with open(filename, "w") as f:
+        f.write(render_chart(chart))
@@ -3,6 +3,8 @@ from pathlib import Path
 
 import numpy as np
 import pandas as pd
+from analysis.disclosure import round_to_base
+from analysis.measure_store import read_measures
 
 
 def write_csv(df, path, **kwargs):
@@ -14,6 +16,11 @@ def group_low_values(df, count_column, code_column, threshold):
     """Suppresses low values and groups suppressed values into
     a new row "Other".
 
+    Counts below the threshold are suppressed. If their total is below the threshold,
+    then the next smallest counts are suppressed too, in order, until it isn't. Rather
+    than finding and suppressing the smallest count one at a time, the counts are
+    sorted once, and the number to suppress is found from their cumulative sum.
+
     Args:
         df: A measure table of counts by code.
         count_column: The name of the count column in the measure table.
@@ -22,50 +29,53 @@ def group_low_values(df, count_column, code_column, threshold):
     Returns:
         A table with redacted counts
     """
+    counts = df[count_column]
+    low = counts < threshold
 
     # get sum of any values < threshold
-    suppressed_count = df.loc[df[count_column] < threshold, count_column].sum()
-    suppressed_df = df.loc[df[count_column] > threshold, count_column]
+    suppressed_count = counts[low].sum()
 
     # if suppressed values >0 ensure total suppressed count > threshold.
     # Also suppress if all values 0
-    if (suppressed_count > 0) | (
-        (suppressed_count == 0) & (len(suppressed_df) != len(df))
+    if not (
+        (suppressed_count > 0)
+        | ((suppressed_count == 0) & ((counts > threshold).sum() != len(df)))
     ):
-        # redact counts < threshold
-        df.loc[df[count_column] < threshold, count_column] = np.nan
+        return df
 
-        # If all values 0, suppress them
-        if suppressed_count == 0:
-            df.loc[df[count_column] == 0, :] = np.nan
+    # drop the counts < threshold, and any missing counts
+    keep = ~low & counts.notna()
 
+    if suppressed_count == 0:
+        # If all values 0, suppress them
+        keep &= counts != 0
+
+    elif suppressed_count < threshold:
+        # suppress the smallest remaining counts, in order (the first of equal counts
+        # first), until the suppressed count reaches the threshold
+        remaining = counts[keep]
+        order = np.argsort(remaining.to_numpy(), kind="stable")
+        cumulative = suppressed_count + np.cumsum(remaining.to_numpy()[order])
+        reached = np.flatnonzero(cumulative >= threshold)
+        if len(reached):
+            n = reached[0] + 1
+            suppressed_count = cumulative[reached[0]]
         else:
-            # if suppressed count < threshold redact further values
-            while suppressed_count < threshold:
-                suppressed_count += df[count_column].min()
-                df.loc[df[count_column].idxmin(), :] = np.nan
+            # every count is suppressed, and there is no "Other" row
+            n = len(remaining)
+            suppressed_count = np.nan
+        keep[remaining.index[order[:n]]] = False
 
-        # drop all rows where count column is null
-        df = df.loc[df[count_column].notnull(), :]
+    df = df.loc[keep, :].copy()
 
-        # add suppressed count as "Other" row (if > threshold)
-        if suppressed_count > threshold:
-            suppressed_count = {code_column: "Other", count_column: suppressed_count}
-            df = pd.concat([df, pd.DataFrame([suppressed_count])], ignore_index=True)
+    # add suppressed count as "Other" row (if > threshold)
+    if suppressed_count > threshold:
+        suppressed_count = {code_column: "Other", count_column: suppressed_count}
+        df = pd.concat([df, pd.DataFrame([suppressed_count])], ignore_index=True)
 
     return df
 
 
-def round_values(x, base=5):
-    rounded = x
-    if isinstance(x, (int, float)):  # noqa: UP038
-        if np.isnan(x):
-            rounded = np.nan
-        else:
-            rounded = int(base * round(x / base))
-    return rounded
-
-
 def create_top_5_code_table(
     df, code_df, code_column, term_column, low_count_threshold, rounding_base, nrows=5
 ):
@@ -87,9 +97,7 @@ def create_top_5_code_table(
 
     # round
 
-    event_counts["num"] = event_counts["num"].apply(
-        lambda x: round_values(x, rounding_base)
-    )
+    event_counts["num"] = round_to_base(event_counts["num"], rounding_base)
 
     # calculate % makeup of each code
     total_events = event_counts["num"].sum()
@@ -111,19 +119,17 @@ def create_top_5_code_table(
     # Rename the code column to something consistent
     event_counts.rename(columns={code_column: "Code"}, inplace=True)
 
-    # sort by proportion of codes
-    event_counts = event_counts.sort_values(
-        ascending=False, by="Proportion of codes (%)"
+    # sort by proportion of codes, keeping equal proportions in code order
+    event_counts_with_counts = event_counts.sort_values(
+        ascending=False, by="Proportion of codes (%)", kind="stable"
     )
 
-    event_counts_with_counts = event_counts.copy()
-
-    # drop events column
-    event_counts = event_counts.loc[
-        :, ["Code", "Description", "Proportion of codes (%)"]
-    ]
-    # return top n rows
-    return event_counts.head(5), event_counts_with_counts
+    # select the top n rows, without sorting the other rows, and drop events column
+    top_n = event_counts.nlargest(nrows, "Proportion of codes (%)", keep="first")
+    return (
+        top_n.loc[:, ["Code", "Description", "Proportion of codes (%)"]],
+        event_counts_with_counts,
+    )
 
 
 def parse_args():
@@ -143,12 +149,17 @@ def parse_args():
     return args
 
 
-def main():
-    args = parse_args()
-    codelist_1_path = args.codelist_1_path
-    codelist_2_path = args.codelist_2_path
-    measure_df = pd.read_csv(args.output_dir / "measure_all.csv")
+def write_top_5_tables(measure_df, codelist_1_path, codelist_2_path, output_dir):
+    """
+    Write the tables of the top 5 codes of each codelist.
 
+    Args:
+        measure_df: A measure table, read from the measure store, with the
+            event_1_code and event_2_code groups.
+        codelist_1_path: Path to codelist for event 1
+        codelist_2_path: Path to codelist for event 2
+        output_dir: The directory to write the tables to
+    """
     code_df = measure_df.loc[measure_df["group"] == "event_1_code", :]
     codelist = pd.read_csv(codelist_1_path, dtype={"code": str})
 
@@ -165,12 +176,12 @@ def main():
         low_count_threshold=7,
         rounding_base=7,
     )
-    top_5_code_table.to_csv(args.output_dir / "top_5_code_table_1.csv", index=False)
+    top_5_code_table.to_csv(output_dir / "top_5_code_table_1.csv", index=False)
 
-    Path(args.output_dir / "for_checking").mkdir(parents=True, exist_ok=True)
+    Path(output_dir / "for_checking").mkdir(parents=True, exist_ok=True)
 
     top_5_code_table_with_counts.to_csv(
-        args.output_dir / "for_checking/top_5_code_table_with_counts_1.csv",
+        output_dir / "for_checking/top_5_code_table_with_counts_1.csv",
         index=False,
     )
 
@@ -192,12 +203,22 @@ def main():
         rounding_base=10,
     )
 
-    top_5_code_table.to_csv(args.output_dir / "top_5_code_table_2.csv", index=False)
+    top_5_code_table.to_csv(output_dir / "top_5_code_table_2.csv", index=False)
     top_5_code_table_with_counts.to_csv(
-        args.output_dir / "for_checking" / "top_5_code_table_with_counts_2.csv",
+        output_dir / "for_checking" / "top_5_code_table_with_counts_2.csv",
         index=False,
     )
 
 
+def main():
+    args = parse_args()
+    measure_df = read_measures(
+        args.output_dir / "measures", groups=["event_1_code", "event_2_code"]
+    )
+    write_top_5_tables(
+        measure_df, args.codelist_1_path, args.codelist_2_path, args.output_dir
+    )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+"""
+Benchmarks for the time it takes to import each analysis entry point.
+
+Each entry point is imported in a new interpreter, as it is when its action runs, and
+the plotting libraries that it imports are reported. None should import them:
+plot_measures imports them only when it draws figures with matplotlib.
+
+These aren't collected by pytest. Run them from the template directory with:
+
+    python -m tests.benchmarks.bench_imports
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+
+TEMPLATE_DIR = Path(__file__).parents[2]
+
+ENTRY_POINTS = [
+    "analysis.measures",
+    "analysis.event_counts",
+    "analysis.measures_and_counts",
+    "analysis.top_5",
+    "analysis.catalog",
+    "analysis.dtypes",
+    "analysis.plot_measures",
+    "analysis.render_report",
+]
+
+PLOTTING_MODULES = ["matplotlib", "seaborn"]
+
+SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+plotting = [m for m in {plotting!r} if m in sys.modules]
+print(seconds, ",".join(plotting))
+"""
+
+
+def time_import(module, repeat):
+    """Times the import of a module in a new interpreter, returning the fastest."""
+    script = SCRIPT.format(module=module, plotting=PLOTTING_MODULES)
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=TEMPLATE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        seconds, _, plotting = result.stdout.strip().partition(" ")
+        timings.append(float(seconds))
+    return min(timings), plotting
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        seconds, plotting = time_import(module, args.repeat)
+        print(f"{module:<40}{seconds * 1000:>10.1f} ms  {plotting}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmarks for the measures script, on measure tables with thousands of practices and
+codes.
+
+These aren't collected by pytest. Run them from the template directory with:
+
+    python -m tests.benchmarks.bench_measures
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+from analysis import measures
+
+from tests.test_measures import (
+    loop_calculate_and_redact_values,
+    loop_drop_redacted_rows,
+)
+
+
+def make_counts_df(practices, codes, months, seed=0):
+    """Make a table of counts, as returned by `measures.calculate_counts`."""
+    rng = np.random.default_rng(seed)
+    groups = [
+        ("sex", ["F", "M"]),
+        ("practice", list(range(practices))),
+        ("event_1_code", [f"{c:06}" for c in range(codes)]),
+        ("event_2_code", [f"{c:06}" for c in range(codes)]),
+    ]
+    dates = pd.date_range("2021-01-01", periods=months, freq="MS").strftime("%Y-%m-%d")
+    df = pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "date": np.repeat(dates, len(group_values)),
+                    "group": group,
+                    "group_value": group_values * months,
+                }
+            )
+            for group, group_values in groups
+        ],
+        ignore_index=True,
+    )
+    df["population"] = rng.integers(1, 200, len(df))
+    df["event_measure"] = rng.binomial(df["population"], 0.1)
+    df = df[measures.MEASURE_COLUMNS].astype(object)
+    return df.sort_values(by=["group", "group_value", "date"])
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"{name:<40}{seconds * 1000:>10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--practices", type=int, default=5000)
+    parser.add_argument("--codes", type=int, default=2000)
+    parser.add_argument("--months", type=int, default=12)
+    args = parser.parse_args()
+
+    df = make_counts_df(args.practices, args.codes, args.months)
+    print(f"{len(df)} rows")
+    bench(
+        "calculate_and_redact_values",
+        lambda: measures.calculate_and_redact_values(df),
+        10,
+    )
+    bench(
+        "calculate_and_redact_values (loop)",
+        lambda: loop_calculate_and_redact_values(df),
+        1,
+    )
+
+    measure_df = measures.calculate_and_redact_values(df)
+    bench("drop_redacted_rows", lambda: measures.drop_redacted_rows(measure_df), 10)
+    bench("drop_redacted_rows (loop)", lambda: loop_drop_redacted_rows(measure_df), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmarks for rendering plot_measures' figures with each renderer.
+
+These aren't collected by pytest. Run them from the template directory with:
+
+    python -m tests.benchmarks.bench_plot_measures
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from analysis import plot_measures
+
+from tests.benchmarks.bench_measures import bench
+from tests.benchmarks.bench_report_utils import make_practice_df
+
+
+def make_measures_df(categories, months, seed=0):
+    """Make a table of the rates of a breakdown's categories, and of the total."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2021-01-01", periods=months, freq="MS")
+    groups = ["total"] + ["breakdown"] * categories
+    values = ["total"] + [f"Category {i}" for i in range(categories)]
+    return pd.DataFrame(
+        {
+            "group": np.tile(groups, months),
+            "group_value": np.tile(values, months),
+            "value": rng.gamma(2, 50, len(groups) * months),
+            "date": np.repeat(dates, len(groups)),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--practices", type=int, default=7000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--months", type=int, default=36)
+    args = parser.parse_args()
+
+    df = make_measures_df(args.categories, args.months)
+    practice_df = make_practice_df(args.practices, args.months)
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_dir = Path(output_dir)
+        for renderer in plot_measures.RENDERERS:
+            plot_measures.init_renderer(renderer)
+            bench(
+                f"render_figures ({renderer})",
+                lambda: plot_measures.render_figures(
+                    plot_measures.figure_jobs(
+                        df, practice_df, ["breakdown"], output_dir, renderer
+                    ),
+                    renderer=renderer,
+                ),
+                1,
+            )
+            sizes = sum(
+                path.stat().st_size
+                for path in output_dir.iterdir()
+                if path.suffix in [".png", ".svg"]
+            )
+            print(f"{'':<40}{sizes:>10,} bytes")
+            for path in output_dir.iterdir():
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Benchmarks for the report utilities, on measure tables with thousands of practices.
+
+These aren't collected by pytest. Run them from the template directory with:
+
+    python -m tests.benchmarks.bench_report_utils
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from analysis import report_utils
+
+from tests.benchmarks.bench_measures import bench
+from tests.test_report_utils import pandas_compute_deciles
+
+
+def make_practice_df(practices, months, seed=0):
+    """Make a table of practice rates, as read from the measure store."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2021-01-01", periods=months, freq="MS")
+    df = pd.DataFrame(
+        {
+            "date": np.repeat(dates, practices),
+            "group_value": np.tile(np.arange(practices), months),
+            "value": rng.gamma(2, 50, practices * months),
+        }
+    )
+    # some practices have no rate, because their counts were redacted
+    df.loc[rng.random(len(df)) < 0.05, "value"] = np.nan
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--practices", type=int, default=7000)
+    parser.add_argument("--months", type=int, default=36)
+    args = parser.parse_args()
+
+    df = make_practice_df(args.practices, args.months)
+    print(f"{len(df)} rows")
+    bench(
+        "compute_deciles",
+        lambda: report_utils.compute_deciles(df, "date", "value"),
+        10,
+    )
+    bench(
+        "compute_deciles (groupby quantile)",
+        lambda: pandas_compute_deciles(df, "date", "value"),
+        10,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import sys
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """Runs the main function of an entry point with command-line arguments."""
+
+    def run(module, *args):
+        monkeypatch.setattr(sys, "argv", [module.__name__, *args])
+        module.main()
+
+    return run
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    """
+    A directory of two monthly cohort files and a weekly cohort file, with a joined
+    copy of each monthly cohort file.
+    """
+    input_dir = tmp_path / "input"
+    (input_dir / "joined").mkdir(parents=True)
+    for i, date in enumerate(["2022-01-01", "2022-02-01"]):
+        df = pd.DataFrame(
+            {
+                "patient_id": range(i, 40 + i),
+                "sex": ["M", "F", "U", "F"] * 10,
+                "region": ["London", "North East", "London", None] * 10,
+                "practice": [p % 12 for p in range(40)],
+                "event_1_code": ["a", "b", "a", None] * 10,
+                "event_2_code": ["c", None] * 20,
+                "event_measure": [1, 0, 1, i] * 10,
+            }
+        )
+        df.to_feather(input_dir / f"input_{date}.feather")
+        df.to_feather(input_dir / "joined" / f"input_{date}.feather")
+    df.to_feather(input_dir / "input_weekly_2022-02-21.feather")
+    return input_dir
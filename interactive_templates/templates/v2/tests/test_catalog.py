@@ -0,0 +1,80 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from analysis import catalog
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    df = pd.DataFrame({"patient_id": [1, 2], "event_measure": [0, 1]})
+    (tmp_path / "joined").mkdir()
+    (tmp_path / "for_checking").mkdir()
+    for name in [
+        "input_2022-02-01.feather",
+        "input_2022-01-01.feather",
+        "joined/input_2022-01-01.feather",
+        "input_weekly_2022-02-07.feather",
+        "input_ethnicity.feather",
+        "for_checking/input_2022-03-01.feather",
+    ]:
+        df.to_feather(tmp_path / name)
+    (tmp_path / "plot_measures.png").write_bytes(b"")
+    (tmp_path / "input_2022-04-01.feather.tmp").write_bytes(b"")
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("input_2022-01-01.feather", ("2022-01-01", False)),
+        ("input_weekly_2022-01-03.feather", ("2022-01-03", True)),
+        ("input_ethnicity.feather", None),
+        ("input_2022-13-01.feather", None),
+        ("input_2022-01-01.feather.tmp", None),
+    ],
+)
+def test_match_cohort_file(name, expected):
+    assert catalog.match_cohort_file(Path(name)) == expected
+
+
+def test_discover(output_dir):
+    obs = catalog.discover(output_dir)
+
+    assert [
+        (f.path.relative_to(output_dir).as_posix(), f.date, f.weekly, f.joined)
+        for f in obs
+    ] == [
+        ("input_2022-01-01.feather", "2022-01-01", False, False),
+        ("joined/input_2022-01-01.feather", "2022-01-01", False, True),
+        ("input_2022-02-01.feather", "2022-02-01", False, False),
+        ("input_weekly_2022-02-07.feather", "2022-02-07", True, False),
+    ]
+    assert obs[0].columns == ("patient_id", "event_measure")
+    assert obs[0].size == (output_dir / "input_2022-01-01.feather").stat().st_size
+
+
+def test_discover_joined_dir(output_dir):
+    obs = catalog.discover(output_dir / "joined")
+
+    assert [(f.date, f.joined) for f in obs] == [("2022-01-01", True)]
+
+
+def test_select(output_dir):
+    cohort_files = catalog.discover(output_dir)
+
+    # the joined file for each month, if there is one
+    obs = catalog.select(cohort_files)
+    assert [(f.date, f.joined) for f in obs] == [
+        ("2022-01-01", True),
+        ("2022-02-01", False),
+    ]
+
+    obs = catalog.select(cohort_files, joined=False)
+    assert [(f.date, f.joined) for f in obs] == [
+        ("2022-01-01", False),
+        ("2022-02-01", False),
+    ]
+
+    obs = catalog.select(cohort_files, weekly=True)
+    assert [f.date for f in obs] == ["2022-02-07"]
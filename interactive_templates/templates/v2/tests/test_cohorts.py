@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+from analysis import cohorts, dtypes, measures
+from pyarrow import feather
+
+
+@pytest.fixture
+def cohort_df():
+    return pd.DataFrame(
+        {
+            "patient_id": [1, 2, 3, 4, 5],
+            "sex": pd.Categorical(["M", "F", "U", None, "F"]),
+            "region": ["London", "London", "North East", None, "South East"],
+            "practice": pd.array([1, 2, 2, 3, None], dtype="Int64"),
+            "event_measure": [True, False, True, True, False],
+        }
+    )
+
+
+def write_feather(df, path):
+    df.to_feather(path)
+    return path
+
+
+def test_read_cohort(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+    filters = {"sex": ["M", "F"], "age_band": ["0-5"]}
+
+    obs = cohorts.read_cohort(
+        path, columns=["event_measure", "practice", "imd"], filters=filters
+    )
+
+    exp = (
+        measures.filter_data(cohort_df, filters)
+        .loc[:, ["event_measure", "practice"]]
+        .reset_index(drop=True)
+        .pipe(dtypes.compact_dtypes)
+    )
+    pd.testing.assert_frame_equal(obs, exp)
+
+
+def test_read_cohort_all_columns(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+
+    obs = cohorts.read_cohort(path, compact=False)
+
+    pd.testing.assert_frame_equal(obs, cohort_df)
+
+
+def test_read_cohort_compact(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+
+    obs = cohorts.read_cohort(path)
+
+    # strings are read as categoricals with sorted categories, as `compact_dtypes`
+    # would convert them
+    pd.testing.assert_frame_equal(obs, dtypes.compact_dtypes(cohort_df))
+    assert obs["region"].cat.categories.tolist() == [
+        "London",
+        "North East",
+        "South East",
+    ]
+
+
+def test_iter_cohorts(tmp_path, cohort_df):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"input_2022-0{i + 1}-01.feather"
+        cohort_df.assign(patient_id=cohort_df["patient_id"] + i).to_feather(path)
+        paths.append(path)
+
+    obs = list(cohorts.iter_cohorts(paths, columns=["patient_id"]))
+
+    assert [path for path, _ in obs] == paths
+    assert [df["patient_id"].min() for _, df in obs] == [1, 2, 3]
+
+
+def test_iter_cohorts_no_paths():
+    assert list(cohorts.iter_cohorts([])) == []
+
+
+def test_iter_cohort_batches(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+    filters = {"sex": ["M", "F"]}
+
+    obs = list(
+        cohorts.iter_cohort_batches(
+            path, columns=["region", "practice"], filters=filters, batch_size=2
+        )
+    )
+
+    # 5 rows in batches of 2, 2 and 1 rows, filtered to 2, 0 and 1 rows
+    assert [len(df) for df in obs] == [2, 0, 1]
+    exp = cohorts.read_cohort(path, columns=["region", "practice"], filters=filters)
+    pd.testing.assert_frame_equal(
+        pd.concat(obs, ignore_index=True).astype(object), exp.astype(object)
+    )
+
+
+def test_iter_cohort_view_batches(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+    views = [
+        (["patient_id", "practice"], None),
+        (["region", "event_measure"], {"sex": ["M", "F"]}),
+    ]
+
+    obs = list(cohorts.iter_cohort_view_batches(path, views, batch_size=2))
+
+    assert [[len(df) for df in dfs] for dfs in obs] == [[2, 2], [2, 0], [1, 1]]
+    for i, (columns, filters) in enumerate(views):
+        exp = cohorts.iter_cohort_batches(path, columns, filters, batch_size=2)
+        for obs_df, exp_df in zip([dfs[i] for dfs in obs], exp):
+            pd.testing.assert_frame_equal(obs_df, exp_df)
+
+
+def test_iter_cohort_batches_empty_file(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.iloc[:0].to_feather(path)
+
+    obs = list(cohorts.iter_cohort_batches(path, columns=["sex", "event_measure"]))
+
+    assert len(obs) == 1
+    assert obs[0].columns.tolist() == ["sex", "event_measure"]
+    assert obs[0].empty
+
+
+def test_estimate_size(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+
+    num_rows, row_bytes = cohorts.estimate_size(path, ["patient_id", "event_measure"])
+
+    # an int64 and a bool, held by both Arrow and pandas
+    assert num_rows == 5
+    assert row_bytes == 2 * (8 + 1)
+
+
+def test_count_rows(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    feather.write_feather(cohort_df, path, chunksize=2)
+
+    assert cohorts.count_rows(path) == 5
+
+
+def test_read_cohort_views(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+    views = [
+        (["patient_id", "practice"], None),
+        (["region", "event_measure"], {"sex": ["M", "F"]}),
+    ]
+
+    obs = cohorts.read_cohort_views(path, views)
+
+    exp = [cohorts.read_cohort(path, columns, filters) for columns, filters in views]
+    assert len(obs) == len(exp)
+    for obs_df, exp_df in zip(obs, exp):
+        pd.testing.assert_frame_equal(obs_df, exp_df)
+
+
+def test_read_cohort_with_lookup(tmp_path, cohort_df):
+    path = tmp_path / "input_2022-01-01.feather"
+    cohort_df.to_feather(path)
+    lookup_path = tmp_path / "input_ethnicity.feather"
+    ethnicity_df = pd.DataFrame(
+        {"patient_id": [3, 1, 2, 6], "ethnicity": ["White", "Black", "Mixed", "Other"]}
+    )
+    ethnicity_df.to_feather(lookup_path)
+    lookup = cohorts.read_lookup(lookup_path, ["ethnicity", "imd"])
+    filters = {"sex": ["M", "F"]}
+
+    obs = cohorts.read_cohort(
+        path, columns=["sex", "ethnicity"], filters=filters, lookup=lookup
+    )
+
+    # as if the lookup were joined to the cohort file, as cohort-joiner joins it
+    joined_df = cohort_df.merge(ethnicity_df, on="patient_id", how="left")
+    exp = cohorts.read_cohort(
+        write_feather(joined_df, tmp_path / "joined.feather"),
+        columns=["sex", "ethnicity"],
+        filters=filters,
+    )
+    pd.testing.assert_frame_equal(obs, exp)
+    assert obs["ethnicity"].tolist() == ["Black", "Mixed", np.nan]
+
+    # a column that is in the cohort file isn't joined
+    batches = cohorts.iter_cohort_batches(
+        tmp_path / "joined.feather", columns=["ethnicity"], batch_size=2, lookup=lookup
+    )
+    obs = pd.concat(batches, ignore_index=True)
+    assert obs["ethnicity"].astype(object).tolist() == joined_df["ethnicity"].tolist()
+
+
+def test_lookup_take():
+    table = pa.table({"patient_id": [3, 1, 3, 2], "ethnicity": ["a", "b", "c", "d"]})
+    keys = pa.chunked_array([[1, 3, 4], [2]])
+
+    obs = cohorts.Lookup(table).take(keys)
+
+    # as `pc.index_in` finds them: the first row of each patient, or null
+    assert (
+        obs.to_pylist() == pc.index_in(keys, value_set=table["patient_id"]).to_pylist()
+    )
+    assert obs.to_pylist() == [1, 0, None, 3]
+
+
+def test_lookup_take_empty():
+    table = pa.table({"patient_id": pa.array([], pa.int64())})
+
+    obs = cohorts.Lookup(table).take(pa.chunked_array([[1, 2]]))
+
+    assert obs.to_pylist() == [None, None]
+
+
+def test_worker_budget(tmp_path):
+    pd.DataFrame({"patient_id": range(100)}).to_feather(tmp_path / "lookup.feather")
+    lookup = cohorts.read_lookup(tmp_path / "lookup.feather")
+    # the table, the sorted keys, and their rows
+    assert lookup.nbytes == 3 * 800
+
+    assert cohorts.worker_budget(None, 2, lookup) is None
+    assert cohorts.worker_budget(10_000, 1) == 10_000
+    assert cohorts.worker_budget(10_000, 1, lookup) == 10_000 - 2400
+    # two workers and this process hold a copy of the lookup
+    assert cohorts.worker_budget(10_000, 2, lookup) == (10_000 - 3 * 2400) // 2
+    assert cohorts.worker_budget(1_000, 2, lookup) == 1
@@ -0,0 +1,102 @@
+import os
+
+import pandas as pd
+import pytest
+from analysis import counts_cache
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "input_2022-01-01.feather"
+    pd.DataFrame({"event_measure": [1, 0, 1]}).to_feather(path)
+    return path
+
+
+def test_cache_key(input_file):
+    key = counts_cache.cache_key(input_file, ["sex"])
+
+    assert key == counts_cache.cache_key(input_file, ["sex"])
+    assert key != counts_cache.cache_key(input_file, ["sex", "region"])
+
+
+def test_cache_key_changes_with_mtime(input_file):
+    key = counts_cache.cache_key(input_file, ["sex"])
+
+    # the same size, but rewritten
+    pd.DataFrame({"event_measure": [1, 1, 1]}).to_feather(input_file)
+    stat = input_file.stat()
+    os.utime(input_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert key != counts_cache.cache_key(input_file, ["sex"])
+
+
+def test_cache_key_changes_with_name(input_file):
+    key = counts_cache.cache_key(input_file, ["sex"])
+
+    renamed = input_file.rename(input_file.with_name("input_2022-02-01.feather"))
+
+    assert key != counts_cache.cache_key(renamed, ["sex"])
+
+
+def test_save_and_load(tmp_path):
+    cache_dir = tmp_path / "cache"
+    counts = [pd.DataFrame({"event_measure": [1], "population": [2]})]
+
+    counts_cache.save(cache_dir, "key", counts)
+
+    obs = counts_cache.load(cache_dir, "key")
+    assert len(obs) == 1
+    pd.testing.assert_frame_equal(obs[0], counts[0])
+    # no temporary files are left behind
+    assert [p.name for p in cache_dir.iterdir()] == ["key.pickle"]
+
+
+def test_load_missing(tmp_path):
+    assert counts_cache.load(tmp_path, "key") is None
+
+
+def test_load_corrupt(tmp_path):
+    (tmp_path / "key.pickle").write_bytes(b"not a pickle")
+
+    assert counts_cache.load(tmp_path, "key") is None
+
+
+def test_iter_cached(tmp_path, input_file):
+    cache_dir = tmp_path / "cache"
+    other_file = input_file.with_name("input_2022-02-01.feather")
+    pd.DataFrame({"event_measure": [0]}).to_feather(other_file)
+    counts_cache.save(cache_dir, counts_cache.cache_key(other_file, ["sex"]), "cached")
+    calculated = []
+
+    def calculate(paths):
+        for path in paths:
+            calculated.append(path)
+            yield path, "calculated"
+
+    obs = list(
+        counts_cache.iter_cached(
+            [input_file, other_file], calculate, cache_dir, [["sex"]]
+        )
+    )
+
+    # the cached counts come first, and only the other input file is calculated
+    assert obs == [(other_file, "cached"), (input_file, "calculated")]
+    assert calculated == [input_file]
+    assert (
+        counts_cache.load(cache_dir, counts_cache.cache_key(input_file, ["sex"]))
+        == "calculated"
+    )
+
+
+def test_source_digest():
+    def count(df):
+        return df["event_measure"].sum()
+
+    def count_rows(df):
+        return len(df)
+
+    digest = counts_cache.source_digest(count)
+
+    assert digest == counts_cache.source_digest(count)
+    assert digest != counts_cache.source_digest(count_rows)
+    assert digest != counts_cache.source_digest(count, count_rows)
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis import disclosure
+from hypothesis import given
+from hypothesis import strategies as st
+
+
+# The scalar implementations that the kernels replace. The kernels should agree with
+# them exactly, including rounding halves to even.
+def scalar_redact_and_round(x, decimals):
+    x = x if x >= 10 else 0
+    return round(x, ndigits=decimals)
+
+
+def scalar_round_to_base(x, base):
+    if np.isnan(x):
+        return np.nan
+    return int(base * round(x / base))
+
+
+@given(
+    st.lists(st.integers(min_value=-1_000, max_value=10**15)),
+    st.sampled_from([-1, -2]),
+)
+def test_redact_and_round(xs, decimals):
+    obs = disclosure.redact_and_round(pd.Series(xs, dtype="int64"), decimals=decimals)
+
+    assert obs.tolist() == [scalar_redact_and_round(x, decimals) for x in xs]
+
+
+@given(st.lists(st.integers(min_value=0)))
+def test_redact_and_round_large_integers(xs):
+    # Python ints that don't fit in an int64 are kept in an object column.
+    obs = disclosure.redact_and_round(pd.Series(xs, dtype=object))
+
+    assert obs.tolist() == [scalar_redact_and_round(x, -1) for x in xs]
+
+
+@given(st.lists(st.integers(min_value=0, max_value=1_000_000).map(float)))
+def test_redact_and_round_floats(xs):
+    obs = disclosure.redact_and_round(pd.Series(xs, dtype=float))
+
+    assert obs.dtype == float
+    assert obs.tolist() == [scalar_redact_and_round(x, -1) for x in xs]
+
+
+@pytest.mark.parametrize("x,expected", [(5, 0), (15, 20), (25, 20), (35, 40)])
+def test_redact_and_round_halves_to_even(x, expected):
+    assert disclosure.redact_and_round(x) == expected
+
+
+def test_redact_and_round_keeps_index():
+    s = pd.Series([4, 16], index=["a", "b"], name="count")
+
+    obs = disclosure.redact_and_round(s)
+
+    assert obs.equals(pd.Series([0, 20], index=["a", "b"], name="count"))
+
+
+def test_round_to_nearest_rejects_positive_decimals():
+    with pytest.raises(ValueError):
+        disclosure.round_to_nearest([1], decimals=1)
+
+
+@given(
+    st.lists(
+        st.one_of(
+            st.integers(min_value=0, max_value=10**12).map(float),
+            st.floats(min_value=0, max_value=10**6),
+            st.just(np.nan),
+        )
+    ),
+    st.sampled_from([5, 7, 10]),
+)
+def test_round_to_base(xs, base):
+    obs = disclosure.round_to_base(pd.Series(xs, dtype=float), base)
+
+    exp = pd.Series([scalar_round_to_base(x, base) for x in xs], dtype=float)
+    assert np.array_equal(obs.to_numpy(dtype=float), exp.to_numpy(), equal_nan=True)
+
+
+def test_round_to_base_integer_result():
+    obs = disclosure.round_to_base(pd.Series([3.0, 10.0, 17.5]), 7)
+
+    assert obs.dtype == np.int64
+    assert obs.tolist() == [0, 7, 14]
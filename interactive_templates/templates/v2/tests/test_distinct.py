@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from analysis.distinct import DistinctCounter
+from hypothesis import given
+from hypothesis import strategies as st
+
+
+@given(st.lists(st.lists(st.integers(min_value=1, max_value=10**12))))
+def test_distinct_counter(chunks):
+    counter = DistinctCounter()
+    for chunk in chunks:
+        counter.update(np.array(chunk, dtype=np.int64))
+
+    # the count that concatenating the chunks and calling `np.unique` gives
+    assert len(counter) == len(np.unique(np.concatenate([[], *chunks])))
+    assert counter.values.tolist() == sorted(set().union(*chunks))
+
+
+@given(st.lists(st.lists(st.one_of(st.none(), st.integers(1, 100)))))
+def test_distinct_counter_missing(chunks):
+    counter = DistinctCounter()
+    for chunk in chunks:
+        counter.update(pd.array(chunk, dtype="Int32"))
+
+    # NaNs are counted as a single distinct value, as by `np.unique`
+    floats = [np.nan if x is None else x for chunk in chunks for x in chunk]
+    assert len(counter) == len(np.unique(np.array(floats, dtype=float)))
+
+
+def test_distinct_counter_empty():
+    assert len(DistinctCounter()) == 0
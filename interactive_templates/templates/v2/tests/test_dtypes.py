@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from analysis import dtypes, measures
+
+
+def cohort_df():
+    return pd.DataFrame(
+        {
+            "patient_id": np.arange(1, 7, dtype=np.int64),
+            "age_years": pd.array([20, 30, 40, 50, 60, None], dtype="Int64"),
+            "sex": ["M", "F", "F", "M", "F", "M"],
+            "region": ["London", None, "London", "North East", "London", "North East"],
+            "practice": pd.array([5, 5, 7, None, 7, 7], dtype="Int64"),
+            "event_1": [1, 0, 1, 1, 0, 1],
+            "event_1_code": ["b", None, "a", "b", None, "a"],
+            "event_measure": np.array([1, 0, 1, 0, 0, 1], dtype=np.int64),
+            "num_events": [0, 3, 1, 2, 0, 300],
+        }
+    )
+
+
+def test_compact_dtypes():
+    df = cohort_df().rename(columns={"num_events": "event_2"})
+
+    obs = dtypes.compact_dtypes(df)
+
+    assert obs.dtypes.to_dict() == {
+        "patient_id": np.int32,
+        "age_years": "Int64",
+        "sex": "category",
+        "region": "category",
+        "practice": "Int32",
+        "event_1": bool,
+        "event_1_code": "category",
+        "event_measure": bool,
+        "event_2": np.uint16,
+    }
+    assert obs["region"].cat.categories.tolist() == ["London", "North East"]
+    # the values are unchanged
+    assert obs.astype(object).equals(df.astype(object))
+
+
+def test_compact_dtypes_ids_that_dont_fit():
+    df = pd.DataFrame({"patient_id": [1, 2**40]})
+
+    obs = dtypes.compact_dtypes(df)
+
+    assert obs["patient_id"].dtype == np.int64
+
+
+def test_compact_dtypes_missing_ids():
+    df = pd.DataFrame({"practice": pd.array([None, None], dtype="Int64")})
+
+    obs = dtypes.compact_dtypes(df)
+
+    assert obs["practice"].dtype == "Int32"
+
+
+def test_compact_dtypes_counts_are_unchanged():
+    df = cohort_df()
+    breakdowns = ["sex", "region", "practice", "event_1_code"]
+
+    obs = measures.calculate_all_counts(dtypes.compact_dtypes(df), breakdowns, "date")
+
+    exp = measures.calculate_all_counts(df, breakdowns, "date")
+    for obs_counts, exp_counts in zip(obs, exp):
+        assert obs_counts.astype(object).equals(exp_counts.astype(object))
+
+
+def test_memory_report():
+    df = cohort_df()
+
+    report = dtypes.memory_report(df, dtypes.compact_dtypes(df))
+
+    assert report.loc["sex", "dtype_before"] == "object"
+    assert report.loc["sex", "dtype_after"] == "category"
+    assert report.loc["total", "bytes_after"] < report.loc["total", "bytes_before"]
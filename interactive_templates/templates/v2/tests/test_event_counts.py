@@ -1,5 +1,6 @@
 import pandas as pd
 from analysis import event_counts
+from analysis.report_utils import drop_zero_practices
 from hypothesis import given
 from hypothesis import strategies as st
 
@@ -45,3 +46,19 @@ def test_get_summary_stats():
     assert (summary_stats["unique_practices"] == ["A", "B", "C"]).all()
     assert (summary_stats["unique_practices_with_events"] == ["A", "B"]).all()
     assert (summary_stats["patients_with_events"] == [1, 2]).all()
+
+
+def test_event_rows():
+    df = pd.DataFrame(
+        {
+            "patient_id": [1, 2, 3, 4, 5, 6],
+            "event_measure": [1, 0, 0, 0, None, 1],
+            "practice": pd.array([1, 1, 2, 3, 3, None], dtype="Int32"),
+        }
+    )
+
+    obs = event_counts.event_rows(df)
+
+    # the same practices as `drop_zero_practices` keeps
+    exp = drop_zero_practices(df, "event_measure")
+    assert set(obs["practice"]) == set(exp["practice"]) == {1}
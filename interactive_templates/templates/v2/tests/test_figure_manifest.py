@@ -0,0 +1,81 @@
+import importlib
+
+import pandas as pd
+import pytest
+from analysis import figure_manifest
+
+
+def draw(df, filename, title=""):
+    pass
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({"date": ["2022-01-01", "2022-02-01"], "value": [1.0, 2.0]})
+
+
+def test_figure_hash(df):
+    digest = figure_manifest.figure_hash(draw, dict(df=df, filename="a.png"))
+
+    assert digest == figure_manifest.figure_hash(
+        draw, dict(df=df.copy(), filename="a.png")
+    )
+    assert digest != figure_manifest.figure_hash(
+        draw, dict(df=df, filename="a.png", title="Title")
+    )
+
+
+@pytest.mark.parametrize(
+    "changed",
+    [
+        lambda df: df.assign(value=[1.0, 3.0]),
+        lambda df: df.assign(value=[1, 2]),
+        lambda df: df.rename(columns={"value": "rate"}),
+        lambda df: df.iloc[:1],
+    ],
+)
+def test_figure_hash_changes_with_data(df, changed):
+    digest = figure_manifest.figure_hash(draw, dict(df=df))
+
+    assert digest != figure_manifest.figure_hash(draw, dict(df=changed(df)))
+
+
+def test_figure_hash_changes_with_source(tmp_path, monkeypatch, df):
+    monkeypatch.syspath_prepend(tmp_path)
+    module_path = tmp_path / "figures.py"
+    module_path.write_text("def draw(df):\n    pass\n")
+    import figures
+
+    digest = figure_manifest.figure_hash(figures.draw, dict(df=df))
+
+    # the same function, drawing differently
+    module_path.write_text("def draw(df):\n    print(df)\n")
+    importlib.reload(figures)
+    assert digest != figure_manifest.figure_hash(figures.draw, dict(df=df))
+
+
+def test_load_and_save(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    assert figure_manifest.load(manifest_path) == {}
+
+    figure_manifest.save(manifest_path, {"a.png": "abc"})
+
+    assert figure_manifest.load(manifest_path) == {"a.png": "abc"}
+    assert [p.name for p in tmp_path.iterdir()] == ["manifest.json"]
+
+
+def test_load_invalid(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text("{")
+
+    assert figure_manifest.load(manifest_path) == {}
+
+
+def test_is_current(tmp_path):
+    path = tmp_path / "a.png"
+    manifest = {"a.png": "abc"}
+
+    assert not figure_manifest.is_current(path, manifest, "abc")
+    path.touch()
+    assert figure_manifest.is_current(path, manifest, "abc")
+    assert not figure_manifest.is_current(path, manifest, "def")
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from analysis import measure_store
+
+
+@pytest.fixture
+def measure_df():
+    return pd.DataFrame(
+        {
+            "group": ["practice", "practice", "region", "region", "total"],
+            "group_value": [1, 2, "", "London", "total"],
+            "value": [250.0, 100.0, "[Redacted]", 200.0, 125.0],
+            "date": [
+                "2022-01-01",
+                "2022-01-01",
+                "2022-01-01",
+                "2022-01-01",
+                "2022-01-01",
+            ],
+            "event_measure": [25, 4, 0, 20, 30],
+            "population": [100, 40, 10, 100, 240],
+        },
+        dtype=object,
+    )
+
+
+def test_read_measures(tmp_path, measure_df):
+    measure_store.write_measures(measure_df, tmp_path)
+
+    obs = measure_store.read_measures(tmp_path)
+
+    assert obs.columns.tolist() == measure_store.COLUMNS
+    assert obs["redacted"].tolist() == [False, False, True, False, False]
+    # the same as reading measure_all.csv, where values are read as strings
+    measure_df.to_csv(tmp_path / "measure_all.csv", index=False)
+    exp = pd.read_csv(tmp_path / "measure_all.csv", parse_dates=["date"])
+    obs = measure_store.to_measure_table(obs)
+    pd.testing.assert_frame_equal(obs.drop(columns="value"), exp.drop(columns="value"))
+    assert obs.to_csv(index=False) == exp.to_csv(index=False)
+
+
+def test_read_measures_groups(tmp_path, measure_df):
+    measure_store.write_measures(measure_df, tmp_path)
+
+    # groups are returned in the order that they were written
+    obs = measure_store.read_measures(tmp_path, ["total", "practice", "sex"])
+
+    assert obs["group"].tolist() == ["practice", "practice", "total"]
+    assert obs["group_value"].tolist() == ["1", "2", "total"]
+    assert obs["value"].tolist() == [250.0, 100.0, 125.0]
+
+
+def test_read_measures_no_groups(tmp_path, measure_df):
+    measure_store.write_measures(measure_df, tmp_path)
+
+    obs = measure_store.read_measures(tmp_path, ["sex"])
+
+    assert obs.empty
+    assert obs.columns.tolist() == measure_store.COLUMNS
+
+
+def test_list_groups(tmp_path, measure_df):
+    measure_store.write_measures(measure_df, tmp_path)
+
+    assert measure_store.list_groups(tmp_path) == ["practice", "region", "total"]
+    assert sorted(p.name for p in tmp_path.glob("*.feather")) == [
+        "practice.feather",
+        "region.feather",
+        "total.feather",
+    ]
@@ -1,6 +1,7 @@
 import pandas as pd
 import pytest
 from analysis import measures
+from analysis.report_utils import calculate_rate
 from hypothesis import given
 from hypothesis import strategies as st
 from hypothesis.extra.pandas import column, data_frames, range_indexes
@@ -153,6 +154,26 @@ def test_calculate_group_counts(df):
     assert obs["population"].sum() == df["population"].sum()
 
 
+@given(df=input_df(), categorical=st.booleans())
+def test_calculate_all_counts(df, categorical):
+    date = "2022-01-01"
+    df["date"] = date
+    if categorical:
+        # every category is counted, even if unobserved
+        df["sex"] = pd.Categorical(df["sex"], categories=["F", "M", "U"])
+
+    obs = measures.calculate_all_counts(df, ["sex", "imd"], date)
+
+    exp = [
+        measures.calculate_total_counts(df, date, group="total", group_value="total"),
+        measures.calculate_group_counts(df, "sex", date),
+        measures.calculate_group_counts(df, "imd", date),
+    ]
+    assert len(obs) == len(exp)
+    for obs_counts, exp_counts in zip(obs, exp):
+        pd.testing.assert_frame_equal(obs_counts, exp_counts)
+
+
 @st.composite
 def measure_df_strategy(draw):
     nrows = 20
@@ -193,3 +214,222 @@ def test_drop_redacted_rows(input_measure_df: pd.DataFrame):
         assert (
             redacted_count / total_count <= 0.5
         ), f"Subgroup {group_value} has more than 50% redacted values"
+
+
+# The implementations that loop over each group, which the vectorised implementations
+# should agree with.
+def loop_calculate_and_redact_values(df):
+    result = pd.DataFrame(columns=["group", "group_value", "value"])
+    for group in df["group"].unique():
+        group_df = df.loc[df["group"] == group, :].copy()
+        if group != "practice":
+            group_df = measures.redact_and_round_column(group_df, "event_measure")
+            group_df = measures.redact_and_round_column(group_df, "population")
+        group_df["value"] = calculate_rate(group_df, "event_measure", "population")
+        if group != "practice":
+            group_df.loc[
+                (group_df["event_measure"] == 0) | (group_df["population"] == 0),
+                "value",
+            ] = "[Redacted]"
+        result = pd.concat([result, group_df], ignore_index=True)
+    return result
+
+
+def loop_drop_redacted_rows(measure_df):
+    for group_value in measure_df["group_value"].unique():
+        group_value_df = measure_df.loc[measure_df["group_value"] == group_value, :]
+        redacted_count = (group_value_df["value"] == "[Redacted]").sum()
+        if redacted_count / group_value_df["value"].count() > 0.5:
+            measure_df = measure_df.loc[measure_df["group_value"] != group_value, :]
+    return measure_df
+
+
+@st.composite
+def counts_df_strategy(draw):
+    group = column(
+        name="group", elements=st.sampled_from(["sex", "practice", "event_1_code"])
+    )
+    group_value = column(name="group_value", elements=st.sampled_from(["a", "b", 1]))
+    date = column(name="date", elements=st.sampled_from(["2022-01-01", "2022-02-01"]))
+    population = column(
+        name="population", elements=st.integers(min_value=1, max_value=1000)
+    )
+    df = draw(
+        data_frames(
+            [date, population, group, group_value],
+            index=range_indexes(min_size=1, max_size=30),
+        )
+    )
+    df["event_measure"] = [
+        draw(st.integers(min_value=0, max_value=p)) for p in df["population"]
+    ]
+    return df[measures.MEASURE_COLUMNS]
+
+
+@given(df=counts_df_strategy())
+def test_calculate_and_redact_values(df):
+    # the counts have the dtypes they have when they are concatenated
+    df = measures.concat_counts([[df]])
+
+    obs = measures.calculate_and_redact_values(df)
+
+    exp = loop_calculate_and_redact_values(df)
+    assert obs.columns.tolist() == exp.columns.tolist()
+    pd.testing.assert_frame_equal(obs, exp)
+    assert obs["value"].tolist() == exp["value"].tolist()
+    # the counts are written as they were, some as floats and some as integers
+    assert obs.to_csv() == exp.to_csv()
+
+
+def test_calculate_and_redact_values_redacts_all_but_practice():
+    df = pd.DataFrame(
+        {
+            "date": ["2022-01-01"] * 4,
+            "event_measure": [4, 16, 4, 25],
+            "population": [40, 100, 40, 100],
+            "group": ["sex", "sex", "practice", "practice"],
+            "group_value": ["F", "M", 1, 2],
+        }
+    )
+
+    obs = measures.calculate_and_redact_values(df)
+
+    assert obs["group"].tolist() == ["sex", "sex", "practice", "practice"]
+    assert obs["event_measure"].tolist() == [0, 20, 4, 25]
+    assert obs["value"].tolist() == ["[Redacted]", 200.0, 100.0, 250.0]
+
+
+@given(input_measure_df=measure_df_strategy(), repeats=st.integers(1, 3))
+def test_drop_redacted_rows_matches_loop(input_measure_df, repeats):
+    # repeat the group values, so that they have more than one value
+    df = pd.concat([input_measure_df] * repeats, ignore_index=True)
+    df["value"] = df["value"].sample(frac=1, random_state=repeats).to_numpy()
+
+    pd.testing.assert_frame_equal(
+        measures.drop_redacted_rows(df), loop_drop_redacted_rows(df)
+    )
+
+
+def write_input_files(tmp_path):
+    paths = []
+    for i, date in enumerate(["2022-01-01", "2022-02-01", "2022-03-01"]):
+        path = tmp_path / f"input_{date}.feather"
+        pd.DataFrame(
+            {
+                "patient_id": [1, 2, 3, 4],
+                "sex": ["M", "F", "F", "U"],
+                "practice": [1, 1, 2, 2],
+                "event_1_code": ["a", "b", None, "a"],
+                "event_2_code": ["c", None, "c", "c"],
+                "event_measure": [1, 0, i % 2, 1],
+            }
+        ).to_feather(path)
+        paths.append(path)
+    return paths
+
+
+def test_calculate_counts_with_workers(tmp_path):
+    paths = write_input_files(tmp_path)
+    breakdowns = ["sex", "practice", "event_1_code", "event_2_code"]
+
+    obs = measures.calculate_counts(paths, breakdowns, workers=2)
+
+    exp = measures.calculate_counts(paths, breakdowns, workers=1)
+    assert obs.equals(exp)
+    assert obs.columns.tolist() == measures.MEASURE_COLUMNS
+    assert obs["date"].tolist()[:7] == ["2022-01-01"] * 7
+    # a total, then 2 sexes (U is filtered out), 2 practices, 2 event 1 codes and 1
+    # event 2 code for each date
+    assert obs.groupby("date").size().tolist() == [1 + 2 + 2 + 2 + 1] * 3
+
+
+@pytest.mark.parametrize("event_measure", [[1, 0, 1, 1], [1.0, None, 0.0, 1.0]])
+def test_calculate_file_counts_with_memory_budget(tmp_path, event_measure):
+    path = tmp_path / "input_2022-01-01.feather"
+    pd.DataFrame(
+        {
+            "sex": pd.Categorical(["M", "F", "F", "M"], categories=["M", "F", "U"]),
+            "practice": [2, 1, 2, 3],
+            "event_1_code": ["b", "a", None, "c"],
+            "event_measure": event_measure,
+        }
+    ).to_feather(path)
+    breakdowns = ["sex", "practice", "event_1_code"]
+
+    # a budget of 1 byte reads the file in batches of 1 row
+    obs = measures.calculate_file_counts(path, breakdowns, memory_budget=1)
+
+    exp = measures.calculate_file_counts(path, breakdowns)
+    assert len(obs) == len(exp)
+    for obs_counts, exp_counts in zip(obs, exp):
+        assert obs_counts["event_measure"].dtype == exp_counts["event_measure"].dtype
+        assert obs_counts.astype(object).equals(exp_counts.astype(object))
+
+
+def test_calculate_counts_with_cache(tmp_path, monkeypatch):
+    paths = write_input_files(tmp_path)
+    breakdowns = ["sex", "practice"]
+    cache_dir = tmp_path / "cache"
+    exp = measures.calculate_counts(paths, breakdowns)
+
+    calculated = []
+    calculate_all_counts = measures.calculate_all_counts
+
+    def spy(df, breakdowns, date):
+        calculated.append(date)
+        return calculate_all_counts(df, breakdowns, date)
+
+    monkeypatch.setattr(measures, "calculate_all_counts", spy)
+
+    obs = measures.calculate_counts(paths, breakdowns, cache_dir=cache_dir)
+    assert obs.equals(exp)
+    assert calculated == ["2022-01-01", "2022-02-01", "2022-03-01"]
+
+    # only the changed input file is read again
+    calculated.clear()
+    pd.read_feather(paths[1]).assign(event_measure=1).to_feather(paths[1])
+    obs = measures.calculate_counts(paths, breakdowns, cache_dir=cache_dir)
+    assert calculated == ["2022-02-01"]
+    assert obs.equals(measures.calculate_counts(paths, breakdowns))
+    assert not obs.equals(exp)
+
+    # every input file is read again when the code that counts them changes
+    calculated.clear()
+
+    def changed_spy(df, breakdowns, date):
+        calculated.append(date)
+        counts = calculate_all_counts(df, breakdowns, date)
+        return counts
+
+    monkeypatch.setattr(measures, "calculate_all_counts", changed_spy)
+    measures.calculate_counts(paths, breakdowns, cache_dir=cache_dir)
+    assert calculated == ["2022-01-01", "2022-02-01", "2022-03-01"]
+
+
+def test_calculate_counts_with_lookup(tmp_path):
+    paths = write_input_files(tmp_path)
+    ethnicity_df = pd.DataFrame(
+        {"patient_id": [1, 2, 3, 5], "ethnicity": ["White", "White", "Black", "Mixed"]}
+    )
+    lookup_path = tmp_path / "input_ethnicity.feather"
+    ethnicity_df.to_feather(lookup_path)
+    joined_dir = tmp_path / "joined"
+    joined_dir.mkdir()
+    joined_paths = []
+    for path in paths:
+        joined_paths.append(joined_dir / path.name)
+        pd.read_feather(path).merge(
+            ethnicity_df, on="patient_id", how="left"
+        ).to_feather(joined_paths[-1])
+    breakdowns = ["sex", "ethnicity"]
+
+    obs = measures.calculate_counts(
+        paths, breakdowns, workers=2, lookup_path=lookup_path
+    )
+
+    assert obs.equals(measures.calculate_counts(joined_paths, breakdowns))
+    assert obs.equals(
+        measures.calculate_counts(paths, breakdowns, lookup_path=lookup_path)
+    )
+    ethnicities = obs.loc[obs["group"] == "ethnicity", "group_value"]
+    assert sorted(ethnicities.unique()) == ["Black", "White"]
@@ -0,0 +1,127 @@
+import shutil
+
+import pandas as pd
+import pytest
+from analysis import cohorts, event_counts, measures, measures_and_counts
+
+
+def test_main(tmp_path, run, input_dir):
+    separate_dir = tmp_path / "separate"
+    fused_dir = tmp_path / "fused"
+    separate_dir.mkdir()
+    fused_dir.mkdir()
+
+    run(
+        measures,
+        "--breakdowns=sex",
+        "--breakdowns=region",
+        f"--input-dir={input_dir / 'joined'}",
+        f"--output-dir={separate_dir}",
+    )
+    run(
+        event_counts,
+        f"--input-dir={input_dir}",
+        f"--output-dir={separate_dir}",
+    )
+    run(
+        measures_and_counts,
+        "--breakdowns=sex",
+        "--breakdowns=region",
+        f"--input-dir={input_dir}",
+        f"--output-dir={fused_dir}",
+    )
+
+    for name in [
+        "measure_all.csv",
+        "measure_practice_rate_deciles.csv",
+        "event_counts.json",
+    ]:
+        assert (fused_dir / name).read_text() == (separate_dir / name).read_text()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"workers": 2}, {"memory_budget": 1}, {"workers": 2, "memory_budget": 1}],
+    ids=["workers", "memory_budget", "both"],
+)
+def test_measures_and_counts_options(tmp_path, input_dir, options):
+    exp_dir = tmp_path / "exp"
+    obs_dir = tmp_path / "obs"
+    exp_dir.mkdir()
+    obs_dir.mkdir()
+    breakdowns = ["sex", "region"]
+
+    measures_and_counts.measures_and_counts(input_dir, exp_dir, breakdowns)
+    # a budget of a byte reads the cohort files a row at a time
+    measures_and_counts.measures_and_counts(input_dir, obs_dir, breakdowns, **options)
+
+    for name in ["measure_all.csv", "event_counts.json"]:
+        assert (obs_dir / name).read_text() == (exp_dir / name).read_text()
+
+
+def test_measures_and_counts_with_cache(tmp_path, monkeypatch, input_dir):
+    exp_dir = tmp_path / "exp"
+    obs_dir = tmp_path / "obs"
+    cache_dir = tmp_path / "cache"
+    exp_dir.mkdir()
+    obs_dir.mkdir()
+    breakdowns = ["sex", "region"]
+    measures_and_counts.measures_and_counts(input_dir, exp_dir, breakdowns)
+
+    measures_and_counts.measures_and_counts(
+        input_dir, obs_dir, breakdowns, cache_dir=cache_dir
+    )
+    assert len(list(cache_dir.iterdir())) == 2
+
+    # the cohort files aren't read again
+    def fail(*args, **kwargs):
+        raise AssertionError("read")
+
+    monkeypatch.setattr(cohorts, "read_cohort_views", fail)
+    measures_and_counts.measures_and_counts(
+        input_dir, obs_dir, breakdowns, cache_dir=cache_dir
+    )
+    for name in ["measure_all.csv", "event_counts.json"]:
+        assert (obs_dir / name).read_text() == (exp_dir / name).read_text()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [[], ["--workers=2"], ["--memory-budget=1"]],
+    ids=["default", "workers", "memory_budget"],
+)
+def test_main_with_ethnicity_file(tmp_path, run, input_dir, options):
+    ethnicity_df = pd.DataFrame(
+        {"patient_id": [1, 2, 3], "ethnicity": ["White", "Black", "White"]}
+    )
+    ethnicity_df.to_feather(input_dir / "input_ethnicity.feather")
+    for path in (input_dir / "joined").iterdir():
+        pd.read_feather(path).merge(
+            ethnicity_df, on="patient_id", how="left"
+        ).to_feather(path)
+    joined_dir = tmp_path / "joined"
+    lookup_dir = tmp_path / "lookup"
+    joined_dir.mkdir()
+    lookup_dir.mkdir()
+    args = ["--breakdowns=sex", "--breakdowns=ethnicity"]
+
+    run(
+        measures_and_counts,
+        *args,
+        f"--input-dir={input_dir}",
+        f"--output-dir={joined_dir}",
+    )
+    shutil.rmtree(input_dir / "joined")
+    run(
+        measures_and_counts,
+        *args,
+        f"--input-dir={input_dir}",
+        f"--output-dir={lookup_dir}",
+        f"--ethnicity-file={input_dir / 'input_ethnicity.feather'}",
+        *options,
+    )
+
+    # the ethnicity file is joined to the cohort files, as cohort-joiner joins them
+    for name in ["measure_all.csv", "event_counts.json"]:
+        assert (lookup_dir / name).read_text() == (joined_dir / name).read_text()
+    assert "Black" in (lookup_dir / "measure_all.csv").read_text()
@@ -0,0 +1,90 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from analysis import (
+    measures_and_counts,
+    pipeline,
+    plot_measures,
+    render_report,
+    top_5,
+)
+
+
+TEMPLATE_DIR = Path(__file__).parents[1]
+
+CONFIG = {
+    "filter_population": "adults",
+    "demographics": ["sex", "region"],
+    "start_date": "2022-01-01",
+    "end_date": "2022-02-01",
+    "codelist_1": {"label": "Codelist 1", "slug": "user/codelist-1"},
+    "codelist_2": {"label": "Codelist 2", "slug": "user/codelist-2"},
+    "time_value": 4,
+    "time_scale": "weeks",
+    "time_event": "before",
+    "time_ever": None,
+}
+
+
+def files(output_dir):
+    return {
+        str(path.relative_to(output_dir)): path.read_bytes()
+        for path in output_dir.rglob("*")
+        if path.is_file()
+    }
+
+
+@pytest.mark.parametrize(
+    "renderer,figure_format", [("matplotlib", "png"), ("svg", "svg")]
+)
+def test_run_pipeline(tmp_path, monkeypatch, run, input_dir, renderer, figure_format):
+    # the report template is loaded relative to the template directory
+    monkeypatch.chdir(TEMPLATE_DIR)
+    for i, codes in [(1, ["a", "b"]), (2, ["c"])]:
+        pd.DataFrame({"code": codes, "term": codes}).to_csv(
+            input_dir / f"codelist_{i}.csv", index=False
+        )
+    # the figures' paths are in the report, so both are run in the same directory
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    breakdowns = ["--breakdowns=sex", "--breakdowns=region"]
+    codelists = [
+        f"--codelist-1-path={input_dir / 'codelist_1.csv'}",
+        f"--codelist-2-path={input_dir / 'codelist_2.csv'}",
+    ]
+
+    run(
+        measures_and_counts,
+        *breakdowns,
+        f"--input-dir={input_dir}",
+        f"--output-dir={output_dir}",
+    )
+    run(top_5, *codelists, f"--output-dir={output_dir}")
+    run(
+        plot_measures,
+        *breakdowns,
+        f"--input-dir={output_dir}",
+        f"--output-dir={output_dir}",
+        f"--renderer={renderer}",
+    )
+    render_report.render(output_dir, **render_report.config_kwargs(CONFIG))
+    separate = files(output_dir)
+
+    shutil.rmtree(output_dir)
+    output_dir.mkdir()
+    pipeline.run_pipeline(
+        input_dir,
+        output_dir,
+        ["sex", "region"],
+        input_dir / "codelist_1.csv",
+        input_dir / "codelist_2.csv",
+        CONFIG,
+        renderer=renderer,
+    )
+
+    # the pipeline writes the same files as the actions
+    assert "report.html" in separate
+    assert f"plot_measures_region.{figure_format}" in separate
+    assert files(output_dir) == separate
@@ -0,0 +1,118 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from analysis import measure_store, plot_measures
+
+
+TEMPLATE_DIR = Path(__file__).parents[1]
+
+
+@pytest.fixture
+def input_dir(tmp_path):
+    rows = []
+    for date in ["2022-01-01", "2022-02-01", "2022-03-01"]:
+        rows.append(["total", "total", 125.0, date, 30, 240])
+        rows.append(["region", "London", 200.0, date, 20, 100])
+        rows.append(["region", "North East", "[Redacted]", date, 0, 10])
+        rows.append(["sex", "F", 100.0, date, 10, 100])
+        rows.append(["sex", "M", 150.0, date, 15, 100])
+        for practice in range(1, 21):
+            rows.append(["practice", practice, 10.0 * practice, date, practice, 100])
+    measure_df = pd.DataFrame(
+        rows,
+        columns=[
+            "group",
+            "group_value",
+            "value",
+            "date",
+            "event_measure",
+            "population",
+        ],
+        dtype=object,
+    )
+    input_dir = tmp_path / "input"
+    measure_store.write_measures(measure_df, input_dir / "measures")
+    return input_dir
+
+
+def plot(input_dir, output_dir, workers=1, *args):
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "analysis.plot_measures",
+            "--breakdowns=region",
+            "--breakdowns=sex",
+            f"--input-dir={input_dir}",
+            f"--output-dir={output_dir}",
+            f"--workers={workers}",
+            *args,
+        ],
+        cwd=TEMPLATE_DIR,
+        check=True,
+    )
+    return {
+        path.name: path.read_bytes()
+        for path in output_dir.rglob("*")
+        if path.suffix in [".png", ".svg"]
+    }
+
+
+def test_main_workers(tmp_path, input_dir):
+    serial = plot(input_dir, tmp_path / "serial", workers=1)
+    parallel = plot(input_dir, tmp_path / "parallel", workers=2)
+
+    assert sorted(serial) == [
+        "deciles_chart.png",
+        "plot_measures.png",
+        "plot_measures_region.png",
+        "plot_measures_sex.png",
+    ]
+    # the figures are rendered the same way, whichever process renders them
+    assert parallel == serial
+
+
+def test_main_skips_unchanged_figures(tmp_path, input_dir):
+    output_dir = tmp_path / "output"
+    figures = plot(input_dir, output_dir, 1, "--skip-unchanged")
+    for path in output_dir.glob("*.png"):
+        path.write_bytes(b"unchanged")
+
+    # the data for the region chart changes
+    df = measure_store.read_measures(input_dir / "measures")
+    df.loc[df["group_value"] == "London", "value"] = 300.0
+    df["value"] = df["value"].where(~df["redacted"], measure_store.REDACTED)
+    measure_store.write_measures(df.drop(columns="redacted"), input_dir / "measures")
+    rerun = plot(input_dir, output_dir, 1, "--skip-unchanged")
+
+    assert {name for name, data in rerun.items() if data != b"unchanged"} == {
+        "plot_measures_region.png"
+    }
+
+    # without the option, every figure is rendered again, as it was first rendered
+    rendered = plot(input_dir, output_dir)
+    assert rendered["plot_measures_sex.png"] == figures["plot_measures_sex.png"]
+    assert b"unchanged" not in rendered.values()
+
+
+def test_main_writes_no_manifest(tmp_path, input_dir):
+    # the job-runner would discard it, as it isn't a declared output
+    output_dir = tmp_path / "output"
+    plot(input_dir, output_dir)
+
+    assert not (output_dir / plot_measures.MANIFEST_NAME).exists()
+
+
+def test_main_svg_renderer(tmp_path, input_dir):
+    figures = plot(input_dir, tmp_path / "output", 1, "--renderer=svg")
+
+    assert sorted(figures) == [
+        "deciles_chart.svg",
+        "plot_measures.svg",
+        "plot_measures_region.svg",
+        "plot_measures_sex.svg",
+    ]
+    assert b"London" in figures["plot_measures_region.svg"]
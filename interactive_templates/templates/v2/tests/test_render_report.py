@@ -0,0 +1,90 @@
+import json
+import re
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+from analysis import measure_store, render_report
+
+
+TEMPLATE_DIR = Path(__file__).parents[1]
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    # the report template is loaded relative to the template directory
+    monkeypatch.chdir(TEMPLATE_DIR)
+
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    for i in [1, 2]:
+        (output_dir / f"top_5_code_table_{i}.csv").write_text(
+            "Code,Description,Proportion of codes (%)\n1,term 1,100.0\n"
+        )
+    event_counts = {
+        "total_events": 100,
+        "total_patients": 200,
+        "unique_patients_with_events": 50,
+        "events_in_latest_period": 10,
+        "total_practices": 20,
+        "total_practices_with_events": 10,
+        "events_in_latest_week": 10,
+        "latest_week": "2022-02-21 - 2022-02-27 inclusive",
+        "latest_month": "2022-02",
+    }
+    (output_dir / "event_counts.json").write_text(json.dumps(event_counts))
+
+    rows = []
+    for date in ["2022-01-01", "2022-02-01"]:
+        rows.append(["total", "total", 125.0, date, 30, 240])
+        rows.append(["sex", "F", 100.0, date, 10, 100])
+        for practice in range(1, 11):
+            rows.append(["practice", practice, 10.0 * practice, date, practice, 100])
+    measure_df = pd.DataFrame(rows, columns=measure_store.COLUMNS[:-1], dtype=object)
+    measure_store.write_measures(measure_df, output_dir / "measures")
+    return output_dir
+
+
+def draw_figures(output_dir, names):
+    for name in names:
+        fig, ax = plt.subplots()
+        ax.plot([1, 2], [1, 2])
+        fig.savefig(output_dir / name)
+        plt.close(fig)
+
+
+def test_render(output_dir):
+    draw_figures(output_dir, ["plot_measures.png", "deciles_chart.png"])
+
+    render_report.render(output_dir, breakdowns=["sex"])
+
+    report = (output_dir / "report.html").read_text()
+    assert report.count('<img src="data:image/png;base64,') == 2
+    # there's no figure for sex
+    assert "This chart has been redacted" in report
+    assert "chart-data" not in report
+
+
+def test_render_interactive(output_dir):
+    render_report.render(output_dir, breakdowns=["sex"], interactive=True)
+
+    report = (output_dir / "report.html").read_text()
+    assert "<img" not in report
+    charts = re.findall(r'<div data-chart="(\w+)"', report)
+    assert charts == ["population", "decile", "sex"]
+    data = re.search(
+        r'<script type="application/json" id="chart-data">(.*?)</script>', report
+    ).group(1)
+    assert set(json.loads(data)) == {"population", "decile", "sex"}
+    assert "function drawChart" in report
+
+
+def test_render_svg_figures(output_dir):
+    draw_figures(output_dir, ["plot_measures.svg", "deciles_chart.png"])
+
+    render_report.render(output_dir, breakdowns=["sex"])
+
+    report = (output_dir / "report.html").read_text()
+    assert report.count('<img src="data:image/svg+xml;base64,') == 1
+    assert report.count('<img src="data:image/png;base64,') == 1
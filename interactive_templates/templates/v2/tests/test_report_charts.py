@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from analysis import measure_store, report_charts
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    rows = []
+    for date in ["2022-01-01", "2022-02-01"]:
+        rows.append(["total", "total", 125.0, date, 30, 240])
+        rows.append(["sex", "M", 150.0, date, 15, 100])
+        rows.append(["sex", "F", 100.123, date, 10, 100])
+        for practice in range(1, 11):
+            rows.append(["practice", practice, 10.0 * practice, date, practice, 100])
+    rows.append(["imd", "2", "[Redacted]", "2022-01-01", 0, 10])
+    rows.append(["imd", "Most deprived", 40.0, "2022-01-01", 20, 500])
+    rows.append(["imd", "Most deprived", 50.0, "2022-02-01", 20, 400])
+    rows.append(["imd", "2", 20.0, "2022-02-01", 20, 1000])
+    measure_df = pd.DataFrame(
+        rows,
+        columns=[
+            "group",
+            "group_value",
+            "value",
+            "date",
+            "event_measure",
+            "population",
+        ],
+        dtype=object,
+    )
+    store_dir = tmp_path / "measures"
+    measure_store.write_measures(measure_df, store_dir)
+    return store_dir
+
+
+@pytest.mark.parametrize(
+    "n, exp",
+    [(1, "1st"), (2, "2nd"), (3, "3rd"), (4, "4th"), (11, "11th"), (91, "91st")],
+)
+def test_ordinal(n, exp):
+    assert report_charts.ordinal(n) == exp
+
+
+def test_chart_data(store_dir):
+    charts = report_charts.chart_data(store_dir, ["sex", "imd", "region"])
+
+    # there's no region group
+    assert list(charts) == ["population", "sex", "imd", "decile"]
+    assert charts["population"] == {
+        "dates": ["2022-01-01", "2022-02-01"],
+        "series": [{"name": "Total", "legend": "Total", "values": [125.0, 125.0]}],
+        "legend": False,
+        "connect": True,
+        "y_label": "Rate per 1000",
+    }
+    # groups are in order of appearance, and values are rounded
+    assert charts["sex"]["series"] == [
+        {"name": "M", "legend": "M", "values": [150.0, 150.0]},
+        {"name": "F", "legend": "F", "values": [100.12, 100.12]},
+    ]
+    # imd groups are in order, and redacted values are missing
+    assert charts["imd"]["series"] == [
+        {"name": "Most deprived", "legend": "Most deprived", "values": [40.0, 50.0]},
+        {"name": "2", "legend": "2", "values": [None, 20.0]},
+    ]
+
+
+def test_chart_data_deciles(store_dir):
+    decile = report_charts.chart_data(store_dir, [])["decile"]
+
+    assert decile["dates"] == ["2022-01-01", "2022-02-01"]
+    assert not decile["connect"]
+    series = {s["name"]: s for s in decile["series"]}
+    assert len(series) == 27
+    assert series["50th percentile"] == {
+        "name": "50th percentile",
+        "style": "median",
+        "legend": "Median",
+        "values": [55.0, 55.0],
+    }
+    assert series["1st percentile"]["style"] == "percentile"
+    assert series["10th percentile"]["legend"] == "Decile"
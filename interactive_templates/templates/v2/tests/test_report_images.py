@@ -0,0 +1,72 @@
+from base64 import b64decode
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from analysis.report_images import ImageEncoder, compress_png
+from PIL import Image
+
+
+@pytest.fixture
+def chart_png():
+    fig, ax = plt.subplots(figsize=(6, 4))
+    ax.plot(np.arange(10), np.arange(10) ** 2)
+    ax.set_title("A chart")
+    png = BytesIO()
+    fig.savefig(png, format="png")
+    plt.close(fig)
+    return png.getvalue()
+
+
+def read_png(data):
+    image = Image.open(BytesIO(data))
+    image.load()
+    return image
+
+
+def test_compress_png(chart_png):
+    compressed = compress_png(chart_png)
+
+    assert len(compressed) < len(chart_png)
+    image = read_png(compressed)
+    assert image.mode == "P"
+    assert image.size == read_png(chart_png).size
+
+
+def test_compress_png_max_width(chart_png):
+    image = read_png(compress_png(chart_png, max_width=300))
+
+    # 600 x 400 pixels, downscaled to keep the aspect ratio
+    assert image.size == (300, 200)
+
+
+def test_image_encoder(tmp_path, chart_png):
+    png_path = tmp_path / "chart.png"
+    png_path.write_bytes(chart_png)
+    svg_path = tmp_path / "chart.svg"
+    svg_path.write_text("<svg></svg>")
+    encoder = ImageEncoder()
+
+    png_uri = encoder.encode(png_path)
+    svg_uri = encoder.encode(svg_path)
+
+    assert png_uri.startswith("data:image/png;base64,")
+    png = b64decode(png_uri.partition(",")[2])
+    assert png == compress_png(chart_png)
+    # other images are embedded as they are
+    assert svg_uri == "data:image/svg+xml;base64,PHN2Zz48L3N2Zz4="
+    assert encoder.bytes_before == len(chart_png) + 11
+    assert encoder.bytes_after == len(png) + 11
+    assert encoder.summary().startswith(f"Images: {len(chart_png) + 11:,} bytes")
+
+
+def test_image_encoder_uncompressed(tmp_path, chart_png):
+    png_path = tmp_path / "chart.png"
+    png_path.write_bytes(chart_png)
+    encoder = ImageEncoder(compress=False)
+
+    png = b64decode(encoder.encode(png_path).partition(",")[2])
+
+    assert png == chart_png
+    assert encoder.summary().endswith("saving 0 bytes (0%)")
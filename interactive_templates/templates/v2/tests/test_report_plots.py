@@ -0,0 +1,99 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.report_plots import deciles_chart, plot_measures
+
+
+@pytest.fixture
+def saved_axes(monkeypatch):
+    axes = []
+    monkeypatch.setattr(plt, "savefig", lambda *args, **kwargs: axes.append(plt.gca()))
+    return axes
+
+
+def test_plot_measures(tmp_path, saved_axes):
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(
+                ["2022-03-01", "2022-01-01", "2022-02-01", "2022-01-01", "2022-03-01"]
+            ),
+            "group_value": ["b", "b", "b", "a", None],
+            "value": [3.0, 1.0, 2.0, 4.0, 5.0],
+        }
+    )
+
+    plot_measures(
+        df,
+        tmp_path / "plot",
+        column_to_plot="value",
+        y_label="Rate per 1000",
+        category="group_value",
+        category_order=["a", "c", "b", "Missing"],
+    )
+
+    (ax,) = saved_axes
+    lines = ax.get_lines()
+    # a line for each category in the data, in order, sorted by date
+    assert [line.get_label() for line in lines] == ["a", "b", "Missing"]
+    assert lines[1].get_ydata().tolist() == [1.0, 2.0, 3.0]
+    # each line takes the next colour, as with a call to `sns.lineplot` for each
+    colours = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+    assert [line.get_color() for line in lines] == colours[:3]
+    assert [t.get_text() for t in ax.get_legend().get_texts()] == ["a", "b", "Missing"]
+    assert ax.get_ylim() == (0, 5.0)
+
+
+def test_plot_measures_categories_in_order_of_appearance(tmp_path, saved_axes):
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2022-01-01", "2022-01-01", "2022-02-01"]),
+            "group_value": ["z", "y", "z"],
+            "value": [1.0, np.nan, 2.0],
+        }
+    )
+
+    plot_measures(
+        df,
+        tmp_path / "plot",
+        column_to_plot="value",
+        y_label="Rate per 1000",
+        category="group_value",
+    )
+
+    (ax,) = saved_axes
+    # a category without values still has a line, and a legend entry
+    assert [line.get_label() for line in ax.get_lines()] == ["z", "y"]
+    assert len(ax.get_lines()[1].get_xdata()) == 0
+
+
+def test_deciles_chart(tmp_path, monkeypatch, saved_axes):
+    # keep the figure, rather than clearing it after saving it
+    monkeypatch.setattr(plt, "clf", lambda: None)
+    df = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2022-01-01"] * 3 + ["2022-02-01"] * 3),
+            "value": [10.0, 20.0, 30.0, 20.0, np.nan, 40.0],
+        }
+    )
+
+    deciles_chart(
+        df, tmp_path / "deciles_chart.png", period_column="date", column="value"
+    )
+
+    (ax,) = saved_axes
+    collections = ax.collections
+    assert [c.get_label() for c in collections] == [
+        "1st-9th, 91st-99th percentile",
+        "Decile",
+        "Median",
+    ]
+    # a line for each percentile, across every date
+    assert [len(c.get_segments()) for c in collections] == [18, 8, 1]
+    (median,) = collections[2].get_segments()
+    assert median[:, 1].tolist() == [20.0, 30.0]
+    assert [t.get_text() for t in ax.get_legend().get_texts()] == [
+        "1st-9th, 91st-99th percentile",
+        "Decile",
+        "Median",
+    ]
@@ -1,5 +1,17 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 import pytest
-from analysis.report_utils import calculate_variable_windows_codelist_2
+from analysis import report_plots, report_utils
+from analysis.report_utils import (
+    calculate_variable_windows_codelist_2,
+    compute_deciles,
+)
+from hypothesis import given
+from hypothesis import strategies as st
 
 
 @pytest.mark.parametrize(
@@ -30,3 +42,107 @@ def test_calculate_variable_windows_codelist_2(
         )
         == expected_date_range
     )
+
+
+def test_plotting_functions():
+    # the plotting functions can still be imported from report_utils
+    from analysis.report_utils import deciles_chart, plot_measures
+
+    assert plot_measures is report_plots.plot_measures
+    assert deciles_chart is report_plots.deciles_chart
+    with pytest.raises(AttributeError):
+        report_utils.plot_measures_by_sex
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "analysis.measures",
+        "analysis.event_counts",
+        "analysis.measures_and_counts",
+        "analysis.top_5",
+        # matplotlib is imported only when it draws the figures
+        "analysis.plot_measures",
+    ],
+)
+def test_analysis_doesnt_import_plotting(module):
+    # a new interpreter, as pytest has already imported matplotlib
+    script = (
+        f"import sys, {module}; "
+        "print(sorted(m for m in ['matplotlib', 'seaborn'] if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def pandas_compute_deciles(
+    measure_table, groupby_col, value_col, has_outer_percentiles=True
+):
+    """Computes the percentiles with pandas' grouped quantile, to compare with."""
+    quantiles = np.arange(0.1, 1, 0.1)
+    if has_outer_percentiles:
+        quantiles = np.concatenate(
+            [quantiles, np.arange(0.01, 0.1, 0.01), np.arange(0.91, 1, 0.01)]
+        )
+
+    percentiles = (
+        measure_table.groupby(groupby_col)[value_col]
+        .quantile(pd.Series(quantiles))
+        .reset_index()
+    )
+    percentiles["percentile"] = round(percentiles["level_1"] * 100)
+    percentiles = percentiles.rename(columns={value_col: "value"})
+
+    return percentiles[[groupby_col, "value", "percentile"]]
+
+
+@given(
+    rows=st.lists(
+        st.tuples(
+            st.sampled_from(["2022-01-01", "2022-02-01", "2022-03-01", None]),
+            st.one_of(
+                st.none(),
+                st.floats(min_value=0, max_value=1000),
+                st.integers(min_value=0, max_value=1000).map(float),
+            ),
+        ),
+    ),
+    has_outer_percentiles=st.booleans(),
+)
+def test_compute_deciles(rows, has_outer_percentiles):
+    df = pd.DataFrame(rows, columns=["date", "value"], dtype=object).astype(
+        {"value": float}
+    )
+    df["date"] = pd.to_datetime(df["date"])
+
+    obs = compute_deciles(df, "date", "value", has_outer_percentiles)
+
+    exp = pandas_compute_deciles(df, "date", "value", has_outer_percentiles)
+    pd.testing.assert_frame_equal(obs, exp, check_exact=True)
+
+
+def test_compute_deciles_interpolates():
+    df = pd.DataFrame(
+        {
+            "date": ["2022-01-01"] * 3 + ["2022-02-01"],
+            "value": [30.0, 10.0, 20.0, np.nan],
+        }
+    )
+
+    obs = compute_deciles(df, "date", "value", has_outer_percentiles=False)
+
+    # between 10, 20 and 30, ignoring the missing value
+    assert obs["value"].tolist()[:9] == pytest.approx(
+        [12.0, 14.0, 16.0, 18.0, 20.0, 22.0, 24.0, 26.0, 28.0]
+    )
+    assert obs["value"][9:].isna().all()
+    assert (
+        obs["percentile"].tolist()
+        == [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0, 90.0] * 2
+    )
@@ -0,0 +1,71 @@
+import xml.etree.ElementTree as ET
+
+from analysis import svg_charts
+
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def chart(**kwargs):
+    return {
+        "dates": ["2022-01-01", "2022-02-01", "2022-03-01"],
+        "series": [
+            {"name": "F", "legend": "F", "values": [100.0, None, 120.0]},
+            {"name": "M & <other>", "legend": "M & <other>", "values": [50.0] * 3},
+        ],
+        "legend": True,
+        "connect": True,
+        "y_label": "Rate per 1000",
+        **kwargs,
+    }
+
+
+def texts(root):
+    return [el.text for el in root.iter(f"{SVG}text")]
+
+
+def test_nice_step():
+    assert svg_charts.nice_step(126, 6) == 25
+    assert svg_charts.nice_step(0.9, 6) == 0.2
+
+
+def test_render_chart():
+    root = ET.fromstring(svg_charts.render_chart(chart()))
+
+    lines = list(root.iter(f"{SVG}polyline"))
+    # a line for each series, connected across the missing value
+    assert len(lines) == 2
+    assert len(lines[0].get("points").split()) == 2
+    assert lines[0].get("stroke") == svg_charts.COLOURS[0]
+    # the names of series are escaped, and a tick is labelled every other month
+    assert "M & <other>" in texts(root)
+    assert "January 2022" in texts(root)
+    assert "February 2022" not in texts(root)
+    assert "March 2022" in texts(root)
+
+
+def test_render_chart_with_gaps():
+    series = [
+        {
+            "name": "Median",
+            "legend": "Median",
+            "style": "median",
+            "values": [1, None, 2],
+        },
+        {"name": "10th", "legend": "Decile", "style": "decile", "values": [1, 1, 1]},
+        {"name": "90th", "legend": "Decile", "style": "decile", "values": [2, 2, 2]},
+    ]
+    root = ET.fromstring(svg_charts.render_chart(chart(series=series, connect=False)))
+
+    lines = list(root.iter(f"{SVG}polyline"))
+    # the median's line has a gap where it has no value
+    assert len(lines) == 4
+    assert lines[2].get("stroke-dasharray") == svg_charts.STYLES["decile"]["dash"]
+    # the legend labels each style once
+    assert texts(root).count("Decile") == 1
+
+
+def test_render_chart_without_data():
+    root = ET.fromstring(svg_charts.render_chart(chart(dates=[], series=[])))
+
+    assert list(root.iter(f"{SVG}polyline")) == []
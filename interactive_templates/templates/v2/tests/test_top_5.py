@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from analysis import top_5
+from hypothesis import given
+from hypothesis import strategies as st
+
+
+# The implementation that suppresses the smallest count one at a time, which the
+# sort-based implementation should agree with.
+def loop_group_low_values(df, count_column, code_column, threshold):
+    suppressed_count = df.loc[df[count_column] < threshold, count_column].sum()
+    suppressed_df = df.loc[df[count_column] > threshold, count_column]
+
+    if (suppressed_count > 0) | (
+        (suppressed_count == 0) & (len(suppressed_df) != len(df))
+    ):
+        df.loc[df[count_column] < threshold, count_column] = np.nan
+
+        if suppressed_count == 0:
+            df.loc[df[count_column] == 0, :] = np.nan
+        else:
+            while suppressed_count < threshold:
+                if df[count_column].isna().all():
+                    suppressed_count = np.nan
+                    break
+                suppressed_count += df[count_column].min()
+                df.loc[df[count_column].idxmin(), :] = np.nan
+
+        df = df.loc[df[count_column].notnull(), :]
+
+        if suppressed_count > threshold:
+            suppressed_count = {code_column: "Other", count_column: suppressed_count}
+            df = pd.concat([df, pd.DataFrame([suppressed_count])], ignore_index=True)
+
+    return df
+
+
+@st.composite
+def counts_df(draw):
+    counts = draw(st.lists(st.integers(min_value=0, max_value=30), max_size=40))
+    return pd.DataFrame(
+        {"code": [f"{i:03}" for i in range(len(counts))], "num": counts}
+    )
+
+
+@given(df=counts_df(), threshold=st.integers(min_value=1, max_value=20))
+def test_group_low_values(df, threshold):
+    obs = top_5.group_low_values(df.copy(), "num", "code", threshold)
+
+    exp = loop_group_low_values(df.copy(), "num", "code", threshold)
+    pd.testing.assert_frame_equal(obs, exp, check_dtype=False)
+
+
+def test_group_low_values_suppresses_smallest_counts():
+    df = pd.DataFrame({"code": ["a", "b", "c", "d", "e"], "num": [3, 20, 12, 12, 50]})
+
+    obs = top_5.group_low_values(df, "num", "code", 10)
+
+    # 3 is below the threshold, then the first 12 is suppressed too, so that the
+    # suppressed count (15) exceeds the threshold
+    assert obs["code"].tolist() == ["b", "d", "e", "Other"]
+    assert obs["num"].tolist() == [20, 12, 50, 15]
+
+
+@given(df=counts_df())
+def test_create_top_5_code_table(df):
+    code_df = pd.DataFrame(
+        {"code": df["code"], "term": df["code"].map("term {}".format)}
+    )
+
+    top_n, with_counts = top_5.create_top_5_code_table(
+        df, code_df, "code", "term", low_count_threshold=7, rounding_base=7
+    )
+
+    # the top rows of the table with counts, which is sorted by proportion
+    assert len(top_n) == min(5, len(with_counts))
+    pd.testing.assert_frame_equal(
+        top_n,
+        with_counts.head(5).loc[:, ["Code", "Description", "Proportion of codes (%)"]],
+    )
+    assert with_counts["Proportion of codes (%)"].is_monotonic_decreasing
@@ -34,3 +34,24 @@ def test_v2_functional_time_ever(tmp_path):
 
     assert local_run.main(tmp_path, ["run_all"])
     assert (tmp_path / "output/id/report.html").exists()
+
+
+def test_v2_functional_single_action(tmp_path):
+    kwargs = v2.TEST_DEFAULTS.copy()
+    kwargs["single_action"] = True
+    analysis = v2.Analysis(**kwargs)
+    render_analysis(analysis, tmp_path)
+
+    assert local_run.main(tmp_path, ["run_all"])
+    assert (tmp_path / "output/id/report.html").exists()
+
+
+def test_v2_functional_without_ethnicity(tmp_path):
+    kwargs = v2.TEST_DEFAULTS.copy()
+    kwargs["demographics"] = ["age", "sex"]
+    analysis = v2.Analysis(**kwargs)
+    render_analysis(analysis, tmp_path)
+
+    assert local_run.main(tmp_path, ["run_all"])
+    assert (tmp_path / "output/id/report.html").exists()
+    assert not (tmp_path / "output/id/input_ethnicity.feather").exists()
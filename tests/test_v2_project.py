@@ -0,0 +1,81 @@
+import itertools
+
+import attrs
+import pytest
+import yaml
+
+from interactive_templates.render import render_analysis
+from interactive_templates.schema import Codelist, v2
+
+
+DEMOGRAPHICS = attrs.fields(v2.Analysis).demographics.validator.member_validator.options
+
+COMBINATIONS = [
+    list(combination)
+    for n in range(len(DEMOGRAPHICS) + 1)
+    for combination in itertools.combinations(DEMOGRAPHICS, n)
+]
+
+
+def render_project(tmp_path, add_codelist, **kwargs):
+    add_codelist("org/slug-a")
+    add_codelist("org/slug-b")
+    analysis = v2.Analysis(
+        **{
+            **v2.TEST_DEFAULTS,
+            "codelist_1": Codelist(label="", slug="org/slug-a", type=""),
+            "codelist_2": Codelist(label="", slug="org/slug-b", type=""),
+            **kwargs,
+        }
+    )
+    render_analysis(analysis, tmp_path)
+    return yaml.safe_load((tmp_path / "project.yaml").read_text())["actions"]
+
+
+@pytest.mark.parametrize("single_action", [False, True], ids=["actions", "single"])
+@pytest.mark.parametrize("demographics", COMBINATIONS, ids=",".join)
+def test_v2_project(tmp_path, add_codelist, demographics, single_action):
+    actions = render_project(
+        tmp_path, add_codelist, demographics=demographics, single_action=single_action
+    )
+
+    # every action that is needed is rendered
+    for action in actions.values():
+        assert set(action.get("needs", [])) <= set(actions)
+
+    measures = actions["run_analysis_id" if single_action else "generate_measures_id"]
+    for demographic in demographics:
+        assert f"--breakdowns={demographic}" in measures["run"]
+    # the cohort files are counted in a process for each of the action's CPUs, and
+    # in half of its memory
+    assert "--workers=2" in measures["run"]
+    assert "--memory-budget=2048" in measures["run"]
+    if not single_action:
+        # the figures are rendered in a process for each CPU, too
+        assert "--workers=2" in actions["plot_measure_id"]["run"]
+
+    # ethnicity is extracted and joined only if it's a breakdown
+    ethnicity = "ethnicity" in demographics
+    assert ("generate_study_population_ethnicity_id" in actions) == ethnicity
+    assert ("generate_study_population_ethnicity_id" in measures["needs"]) == ethnicity
+    assert ("--ethnicity-file" in measures["run"]) == ethnicity
+    assert not any(name.startswith("join_cohorts") for name in actions)
+
+
+@pytest.mark.parametrize("single_action", [False, True], ids=["actions", "single"])
+@pytest.mark.parametrize("figure_format", ["png", "svg"])
+def test_v2_project_figure_format(tmp_path, add_codelist, single_action, figure_format):
+    actions = render_project(
+        tmp_path,
+        add_codelist,
+        single_action=single_action,
+        figure_format=figure_format,
+    )
+
+    plots = actions["run_analysis_id" if single_action else "plot_measure_id"]
+    renderer = "svg" if figure_format == "svg" else "matplotlib"
+    assert f"--renderer={renderer}" in plots["run"]
+    # the figures are declared in the format that they're drawn in
+    outputs = plots["outputs"]["moderately_sensitive"].values()
+    assert f"output/id/plot_measure*.{figure_format}" in outputs
+    assert f"output/id/deciles_chart.{figure_format}" in outputs